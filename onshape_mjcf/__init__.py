@@ -8,6 +8,7 @@ from onshape_mjcf.to_mjcf_basic import MJCFBuildOptions, toMJCFBasic
 
 def toMJCFBasicCommand():
     import argparse
+    from onshape_mjcf.onshape_api.client import cache
 
     parser = argparse.ArgumentParser(
         "onshape-to-mjcf-basic"
@@ -20,10 +21,10 @@ def toMJCFBasicCommand():
     creds = OnshapeCredentials.from_env()
     client = Client(creds)
 
-    data = OnshapeData.from_onshape(client, args.documentId, args.assemblyName)
-    description = RobotDescription.from_onshape(data, args.rootName)
+    with cache.batch():
+        data = OnshapeData.from_onshape(client, args.documentId, args.assemblyName)
+        description = RobotDescription.from_onshape(data, args.rootName)
 
-    mjcf = toMJCFBasic(data, description)
+        mjcf = toMJCFBasic(data, description)
 
-    with open("robot.xml", "w") as f:
-        f.write(mjcf.toString())
\ No newline at end of file
+    mjcf.writeTo("robot.xml")
\ No newline at end of file
@@ -1,14 +1,17 @@
-from functools import cached_property
-import math
 from typing import Self
 import numpy as np
-from scipy.spatial.transform import Rotation
 import lxml.etree
 import lxml.builder
 
+from onshape_mjcf.util.rotation import matrixToQuat, matricesToQuats
+
 E = lxml.builder.ElementMaker()
 
 float_format = "{:.8f}".format
+float2_format = "{:.8f} {:.8f}".format
+float3_format = "{:.8f} {:.8f} {:.8f}".format
+float4_format = "{:.8f} {:.8f} {:.8f} {:.8f}".format
+float6_format = "{:.8f} {:.8f} {:.8f} {:.8f} {:.8f} {:.8f}".format
 
 def check_symmetric(a, tol=1e-8):
     return np.all(np.abs(a-a.T) < tol)
@@ -21,49 +24,42 @@ class SetterProperty(object):
         return self.func(obj, value)
 
 class BaseBuilder:
-    def __init__(self, element):
+    def __init__(self, element, deferred: list | None = None):
         self.elem = element
+        self._deferred = deferred
 
-    def _addElem(self, typ):
-        elem = E(typ)
-        self.elem.append(elem)
-        return elem
+    def _addElem(self, typ, **attrib):
+        return lxml.etree.SubElement(self.elem, typ, **attrib)
 
 class PositionMixin:
     @SetterProperty
     def pos(self, pos: np.array):
         assert pos.shape == (3,)
-        self.elem.set("pos", " ".join(map(float_format, pos)))
+        self.elem.set("pos", float3_format(*pos.tolist()))
 
 class RotationMixin:
     @SetterProperty
     def quat(self, quat: np.array):
         assert quat.shape == (4,)
-        self.elem.set("quat", " ".join(map(float_format, quat)))
+        self.elem.set("quat", float4_format(*quat.tolist()))
     @SetterProperty
     def euler(self, euler: np.array):
         assert euler.shape == (3,)
-        self.elem.set("euler", " ".join(map(float_format, euler)))
-
-# interesting: 9
-
-#from itertools import permutations
-#quat_order = list(list(permutations([0, 1, 2, 3]))[18])
-#print(quat_order)
-#assert False
-quat_order = [3, 0, 1, 2]
+        self.elem.set("euler", float3_format(*euler.tolist()))
 
 class TransformMixin(PositionMixin, RotationMixin):
     @SetterProperty
     def transform(self, transform: np.array):
-        transform = np.asarray(transform).copy()
+        transform = np.asarray(transform)
         assert transform.shape == (4, 4)
-        self.pos = transform[:3, 3].reshape((3,))
-        #self.quat = Rotation.from_matrix(transform[:3, :3]).as_quat()[quat_order] 
-
-        # WORKS (??)
-        self.euler = Rotation.from_matrix(transform[:3, :3]).as_euler("XYZ")
-        #self.quat = Rotation.from_matrix(transform[:3, :3]).as_quat()[[3, 0, 1, 2]] 
+        if self._deferred is not None:
+            # Converted together with every other transform in the document
+            # when it is serialized, see `MJCFBuilder._applyTransforms`.
+            # Copied since the caller may mutate its array before then.
+            self._deferred.append((self.elem, transform.copy()))
+        else:
+            self.pos = transform[:3, 3].reshape((3,))
+            self.quat = np.array(matrixToQuat(transform[:3, :3]))
 
 class NameMixin:
     @SetterProperty
@@ -74,13 +70,13 @@ class JointBuilder(NameMixin, BaseBuilder):
     @SetterProperty
     def range(self, value: tuple[float, float]):
         minL, maxL = value
-        self.elem.set("range", float_format(minL) + " " + float_format(maxL))
+        self.elem.set("range", float2_format(minL, maxL))
     @SetterProperty
     def axis(self, value: np.ndarray):
-        self.elem.set("axis", " ".join(map(float_format, value)))
+        self.elem.set("axis", float3_format(*np.asarray(value).tolist()))
     @SetterProperty
     def pos(self, value: np.ndarray):
-        self.elem.set("pos", " ".join(map(float_format, value)))
+        self.elem.set("pos", float3_format(*np.asarray(value).tolist()))
     @SetterProperty
     def frictionloss(self, value: float):
         self.elem.set("frictionloss", float_format(value))
@@ -91,30 +87,24 @@ class JointBuilder(NameMixin, BaseBuilder):
 class InertialBuilder(BaseBuilder):
     @SetterProperty
     def inertia(self, inertia: np.array):
+        # Only evaluated in debug mode, stripped along with the assert under -O.
         assert check_symmetric(inertia)
-        elems = [
-            inertia[0, 0],
-            inertia[1, 1],
-            inertia[2, 2],
-            inertia[0, 1],
-            inertia[0, 2],
-            inertia[1, 2]
-        ]
-        self.elem.set("fullinertia", " ".join(map(float_format, elems)))
+        (ixx, ixy, ixz), (_iyx, iyy, iyz), (_izx, _izy, izz) = inertia.tolist()
+        self.elem.set("fullinertia", float6_format(ixx, iyy, izz, ixy, ixz, iyz))
     @SetterProperty
     def diaginertia(self, axes: np.array):
         assert axes.shape == (3,)
-        self.elem.set("diaginertia", " ".join(map(float_format, axes)))
+        self.elem.set("diaginertia", float3_format(*axes.tolist()))
     @SetterProperty
     def xyaxes(self, axes: np.array):
         assert axes.shape == (2, 3)
-        self.elem.set("xyaxes", " ".join(map(float_format, axes.reshape(6))))
+        self.elem.set("xyaxes", float6_format(*axes.ravel().tolist()))
     @SetterProperty
     def mass(self, mass: float):
         self.elem.set("mass", float_format(mass))
     @SetterProperty
     def pos(self, pos: np.ndarray):
-        self.elem.set("pos", " ".join(map(float_format, pos)))
+        self.elem.set("pos", float3_format(*np.asarray(pos).tolist()))
 
 class GeomBuilder(NameMixin, TransformMixin, BaseBuilder):
     @SetterProperty
@@ -136,47 +126,40 @@ class GeomBuilder(NameMixin, TransformMixin, BaseBuilder):
         if len(npValue.shape) == 0:
             self.elem.set("size", float_format(value))
         else:
-            self.elem.set("size", " ".join(map(float_format, npValue)))
+            self.elem.set("size", " ".join(map(float_format, npValue.tolist())))
     @SetterProperty
     def fromto(self, value: np.array):
         assert value.shape == (2, 3)
-        self.elem.set("fromto", " ".join(map(float_format, value.reshape(6))))
+        self.elem.set("fromto", float6_format(*value.ravel().tolist()))
 
 class SiteBuilder(NameMixin, PositionMixin, BaseBuilder):
     pass
 
 class BodyBuilder(NameMixin, TransformMixin, BaseBuilder):
+    def __init__(self, element, deferred: list | None = None):
+        super().__init__(element, deferred)
+        self._inertial = None
+
     def body(self, name) -> Self:
-        Ebody = E.body()
-        Ebody.set("name", name)
-        self.elem.append(Ebody)
-        return BodyBuilder(Ebody)
+        return BodyBuilder(self._addElem("body", name=name), self._deferred)
 
     def joint(self) -> JointBuilder:
-        Ejoint = E.joint()
-        self.elem.append(Ejoint)
-        return JointBuilder(Ejoint)
+        return JointBuilder(self._addElem("joint"))
 
     def freeJoint(self) -> JointBuilder:
-        Efreejoint = E.freejoint()
-        self.elem.append(Efreejoint)
-        return JointBuilder(Efreejoint)
+        return JointBuilder(self._addElem("freejoint"))
 
     def geom(self) -> GeomBuilder:
-        Egeom = E.geom()
-        self.elem.append(Egeom)
-        return GeomBuilder(Egeom)
+        return GeomBuilder(self._addElem("geom"), self._deferred)
 
     def site(self) -> SiteBuilder:
-        Esite = E.site()
-        self.elem.append(Esite)
-        return SiteBuilder(Esite)
+        return SiteBuilder(self._addElem("site"))
 
-    @cached_property
+    @property
     def inertial(self) -> InertialBuilder:
-        Einertial = E.inertial()
-        self.elem.append(Einertial)
-        return InertialBuilder(Einertial)
+        if self._inertial is None:
+            self._inertial = InertialBuilder(self._addElem("inertial"))
+        return self._inertial
 
 class MeshBuilder(NameMixin, BaseBuilder):
     @SetterProperty
@@ -197,7 +180,7 @@ class ConnectBuilder(NameMixin, BaseBuilder):
     @SetterProperty
     def anchor(self, pos: np.array):
         assert pos.shape == (3,)
-        self.elem.set("anchor", " ".join(map(float_format, pos)))
+        self.elem.set("anchor", float3_format(*pos.tolist()))
 
 class EqualityBuilder(BaseBuilder):
     def connect(self) -> ConnectBuilder:
@@ -206,28 +189,65 @@ class EqualityBuilder(BaseBuilder):
 class MJCFBuilder:
     def __init__(self):
         self.Emjcf = E.mujoco()
+        self._deferredTransforms = []
+        self._worldBody = None
+        self._asset = None
+        self._equality = None
 
     @property
     def element(self):
+        self._applyTransforms()
         return self.Emjcf
 
-    @cached_property
+    @property
     def worldBody(self) -> BodyBuilder:
-        self.Eworldbody = E.worldbody()
-        self.Emjcf.append(self.Eworldbody)
-        return BodyBuilder(self.Eworldbody)
+        if self._worldBody is None:
+            self.Eworldbody = lxml.etree.SubElement(self.Emjcf, "worldbody")
+            self._worldBody = BodyBuilder(self.Eworldbody, self._deferredTransforms)
+        return self._worldBody
 
-    @cached_property
+    @property
     def asset(self) -> AssetBuilder:
-        self.Easset = E.asset()
-        self.Emjcf.append(self.Easset)
-        return AssetBuilder(self.Easset)
+        if self._asset is None:
+            self.Easset = lxml.etree.SubElement(self.Emjcf, "asset")
+            self._asset = AssetBuilder(self.Easset)
+        return self._asset
 
-    @cached_property
+    @property
     def equality(self) -> EqualityBuilder:
-        self.Eequality = E.equality()
-        self.Emjcf.append(self.Eequality)
-        return EqualityBuilder(self.Eequality)
+        if self._equality is None:
+            self.Eequality = lxml.etree.SubElement(self.Emjcf, "equality")
+            self._equality = EqualityBuilder(self.Eequality)
+        return self._equality
+
+    def _applyTransforms(self):
+        """
+        Writes out `pos`/`quat` for every transform set on a body or geom,
+        converting all of the rotations in a single batch.
+        """
+        if len(self._deferredTransforms) == 0:
+            return
+
+        transforms = np.stack([transform for _elem, transform in self._deferredTransforms])
+        poss = transforms[:, :3, 3].tolist()
+        quats = matricesToQuats(transforms[:, :3, :3]).tolist()
+
+        for (elem, _transform), pos, quat in zip(self._deferredTransforms, poss, quats):
+            elem.set("pos", float3_format(*pos))
+            elem.set("quat", float4_format(*quat))
+
+        self._deferredTransforms.clear()
 
     def toString(self):
-        return lxml.etree.tostring(self.Emjcf, pretty_print=True, encoding=str)
\ No newline at end of file
+        self._applyTransforms()
+        return lxml.etree.tostring(self.Emjcf, pretty_print=True, encoding=str)
+
+    def writeTo(self, path):
+        """
+        Serializes the document straight to a file, without building
+        the whole string in memory first.
+        """
+        self._applyTransforms()
+        with lxml.etree.xmlfile(path, encoding="utf-8") as xf:
+            xf.write_declaration()
+            xf.write(self.Emjcf, pretty_print=True)
\ No newline at end of file
@@ -6,23 +6,102 @@ Convenience functions for working with the Onshape API
 '''
 
 #from onshape_mjcf.onshape_data import QualifiedRef
-from collections import OrderedDict
 from dataclasses import dataclass
 from .onshape import Onshape
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 import mimetypes
 import random
 import string
 import os
 import json
 import hashlib
-import base64
+import sqlite3
 from pathlib import Path
 
-from keyvalue_sqlite import KeyValueSqlite
+# orjson is optional (the `fast-json` extra), it decodes the large assembly responses considerably faster.
+try:
+    import orjson
+    json_loads = orjson.loads
+    def json_dumps(value):
+        return orjson.dumps(value).decode()
+except ImportError:
+    json_loads = json.loads
+    json_dumps = json.dumps
+
+# Datatype signifiers for cached responses.
+DT_JSON = 0
+DT_BIN = 1
+
+class RequestCache:
+    '''
+    Persistent key-value cache for Onshape API responses, backed by sqlite.
+
+    Values are dicts of `{"dt": <datatype signifier>, "d": <data>}`.
+    JSON responses are stored as JSON text, binary responses are stored
+    as raw bytes in a separate BLOB table.
+
+    Keeps a single connection open in WAL mode, and memoizes JSON text
+    in-process so repeated lookups within a run don't go back to sqlite.
+    Every lookup decodes a fresh copy, so callers are free to mutate what
+    they get back. Binary values are not memoized, they are only read when
+    asked for.
+    '''
+
+    def __init__(self, path, table="request_cache", blobTable="blob_cache"):
+        self._table = table
+        self._blobTable = blobTable
+        self._memory = {}
+        self._batchDepth = 0
+
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY UNIQUE NOT NULL, value TEXT)")
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS {blobTable} (key TEXT PRIMARY KEY UNIQUE NOT NULL, data BLOB)")
+
+    def get(self, key):
+        text = self._memory.get(key)
+        if text is None:
+            row = self._conn.execute(f"SELECT value FROM {self._table} WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                row = self._conn.execute(f"SELECT data FROM {self._blobTable} WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                return {"dt": DT_BIN, "d": row[0]}
+            text = row[0]
+            self._memory[key] = text
+        return json_loads(text)
+
+    def set(self, key, value):
+        if value["dt"] == DT_BIN:
+            self._conn.execute(f"INSERT OR REPLACE INTO {self._blobTable} (key, data) VALUES (?, ?)", (key, value["d"]))
+        else:
+            text = json_dumps(value)
+            self._memory[key] = text
+            self._conn.execute(f"INSERT OR REPLACE INTO {self._table} (key, value) VALUES (?, ?)", (key, text))
+        if self._batchDepth == 0:
+            self._conn.commit()
+
+    @contextmanager
+    def batch(self):
+        '''
+        Groups all writes made within the block into a single transaction.
+
+        The transaction is committed even if the block raises, responses
+        fetched up to that point are still valid cache entries.
+        '''
+        self._batchDepth += 1
+        try:
+            yield self
+        finally:
+            self._batchDepth -= 1
+            if self._batchDepth == 0:
+                self._conn.commit()
 
 DB_PATH = "./cache.sqlite"
-cache = KeyValueSqlite(DB_PATH, "request_cache")
+cache = RequestCache(DB_PATH, "request_cache")
 
 def escape_url(s):
     return s.replace('/', '%2f').replace('+', '%2b')
@@ -80,42 +159,117 @@ class Client():
         self._api = Onshape(credentials=credentials, logging=logging)
         self.useCollisionsConfigurations = True
 
-    def request_cached(self, method, url, query={}, body={}, headers={}):
+    def _cache_key(self, method, url, query={}, body={}, headers={}):
         key = {
             "method": method,
             "url": url,
-            "query": OrderedDict(query.items()),
-            "body": OrderedDict(body.items()),
-            "headers": OrderedDict(headers.items())
+            "query": query,
+            "body": body,
+            "headers": headers
         }
-        key_json = json.dumps(key)
+        # Canonical JSON of the request, hashed down to a fixed size key.
+        return hashlib.blake2b(json.dumps(key, sort_keys=True).encode(), digest_size=16).hexdigest()
 
-        cache_data = cache.get(key_json)
-        if cache_data is None:
-            response = self._api.request(method, url, query=query, body=body)
-
-            if response.status_code != 200:
-                raise Exception(f"bad response: {response}")
-
-            content_type = response.headers["content-type"]
-            match content_type:
-                case "application/json;charset=utf-8":
-                    cache_data = {"dt": "json", "d": response.json()}
-                case "application/sla;charset=utf-8":
-                    cache_data = {"dt": "bin", "d": base64.b64encode(response.content).decode()}
-                case _:
-                    raise Exception(f"unknown content type {content_type}")
-
-            cache.set(key_json, cache_data)
-
-        match cache_data["dt"]:
-            case "json":
-                return cache_data["d"]
-            case "bin":
-                return base64.b64decode(cache_data["d"])
+    def _fetch(self, method, url, query={}, body={}, headers={}):
+        response = self._api.request(method, url, query=query, body=body)
+
+        if response.status_code != 200:
+            raise Exception(f"bad response: {response}")
+
+        content_type = response.headers["content-type"]
+        match content_type:
+            case "application/json;charset=utf-8":
+                return {"dt": DT_JSON, "d": json_loads(response.content)}
+            case "application/sla;charset=utf-8":
+                return {"dt": DT_BIN, "d": response.content}
             case _:
-                raise Exception(f"unknown datatype signifier: {cache_data["dt"]}")
+                raise Exception(f"unknown content type {content_type}")
+
+    def _decode(self, cache_data):
+        dt = cache_data["dt"]
+        if dt != DT_JSON and dt != DT_BIN:
+            raise Exception(f"unknown datatype signifier: {dt}")
+        return cache_data["d"]
+
+    def request_cached(self, method, url, query={}, body={}, headers={}):
+        key_hash = self._cache_key(method, url, query=query, body=body, headers=headers)
+
+        cache_data = cache.get(key_hash)
+        if cache_data is None:
+            cache_data = self._fetch(method, url, query=query, body=body, headers=headers)
+            cache.set(key_hash, cache_data)
+
+        return self._decode(cache_data)
 
+    def request_cached_iter(self, requests, max_workers=8):
+        '''
+        Like `request_cached_many`, but yields `(index, result)` pairs as soon
+        as each result is available, instead of waiting for all of them.
+        Cache hits come first, then fetched responses in completion order.
+
+        Every successful fetch is cached as it completes. If any fetch fails,
+        the others are still completed and cached before the first error is
+        raised.
+
+        Args:
+            - requests (list[dict]): Keyword arguments for `request_cached`, one per request
+            - max_workers (int, default=8): Maximum number of concurrent requests
+        '''
+
+        # Key -> indices of the requests for it, duplicates are only fetched once.
+        missing = {}
+        for idx, request in enumerate(requests):
+            key = self._cache_key(**request)
+            cache_data = cache.get(key)
+            if cache_data is None:
+                missing.setdefault(key, []).append(idx)
+            else:
+                yield idx, self._decode(cache_data)
+
+        if len(missing) == 0:
+            return
+
+        error = None
+        with ThreadPoolExecutor(max_workers=max_workers) as executor, cache.batch():
+            futures = {executor.submit(self._fetch, **requests[idxs[0]]): key for key, idxs in missing.items()}
+            for future in as_completed(futures):
+                key = futures[future]
+                try:
+                    cache_data = future.result()
+                except Exception as e:
+                    if error is None:
+                        error = e
+                    continue
+
+                cache.set(key, cache_data)
+
+                # The fetched value goes to the first request for its key,
+                # duplicates get their own decoded copy.
+                first, *duplicates = missing[key]
+                yield first, self._decode(cache_data)
+                for idx in duplicates:
+                    yield idx, self._decode(cache.get(key))
+
+        if error is not None:
+            raise error
+
+    def request_cached_many(self, requests, max_workers=8):
+        '''
+        Like `request_cached`, but for many independent requests at once.
+        Requests which miss the cache are issued concurrently.
+
+        Args:
+            - requests (list[dict]): Keyword arguments for `request_cached`, one per request
+            - max_workers (int, default=8): Maximum number of concurrent requests
+
+        Returns:
+            - list: Results, in the same order as `requests`
+        '''
+
+        results = [None] * len(requests)
+        for idx, result in self.request_cached_iter(requests, max_workers=max_workers):
+            results[idx] = result
+        return results
 
     # NOT cached
     def get_document(self, documentId):
@@ -164,7 +318,7 @@ class Client():
         url = f'/api/metadata/d/{ref.documentId}/m/{ref.microversionId}/e/{ref.elementId}/p/{partId}'
         return self.request_cached("get", url, query=query)
 
-    def get_part_studio_mass_properties(self, ref, linkDocumentId=None, useMassPropertyOverrides=False, massAsGroup=False):
+    def _part_studio_mass_properties_request(self, ref, linkDocumentId=None, useMassPropertyOverrides=False, massAsGroup=False):
         query = {
             "configuration": ref.configuration,
             "useMassPropertyOverrides": useMassPropertyOverrides,
@@ -174,12 +328,31 @@ class Client():
             query["linkDocumentId"] = linkDocumentId
 
         url = f'/api/partstudios/d/{ref.documentId}/m/{ref.microversionId}/e/{ref.elementId}/massproperties'
-        return self.request_cached("get", url, query=query)
+        return {"method": "get", "url": url, "query": query}
+
+    def get_part_studio_mass_properties(self, ref, linkDocumentId=None, useMassPropertyOverrides=False, massAsGroup=False):
+        return self.request_cached(**self._part_studio_mass_properties_request(ref, linkDocumentId=linkDocumentId, useMassPropertyOverrides=useMassPropertyOverrides, massAsGroup=massAsGroup))
 
     def get_part_mass_properties(self, ref, linkDocumentId=None, useMassPropertyOverrides=False):
         part_studio_props = self.get_part_studio_mass_properties(ref.ref, linkDocumentId=linkDocumentId, useMassPropertyOverrides=useMassPropertyOverrides)
         return part_studio_props["bodies"][ref.partId]
 
+    def get_part_mass_properties_many(self, refs, linkDocumentId=None, useMassPropertyOverrides=False):
+        '''
+        Like `get_part_mass_properties`, but for many parts at once.
+        Parts from the same part studio share a single request.
+
+        Returns:
+            - list: Mass properties, in the same order as `refs`
+        '''
+
+        requests = [
+            self._part_studio_mass_properties_request(ref.ref, linkDocumentId=linkDocumentId, useMassPropertyOverrides=useMassPropertyOverrides)
+            for ref in refs
+        ]
+        results = self.request_cached_many(requests)
+        return [props["bodies"][ref.partId] for ref, props in zip(refs, results)]
+
     """
     Workaround due to buggy Onshape API.
     This needs to be used for standard content. Normally `get_part_mass_properties` can be used.
@@ -200,7 +373,7 @@ class Client():
     Workaround due to buggy Onshape API.
     This needs to be used for standard content. Normally `get_part_mass_properties` can be used.
     """
-    def get_direct_part_mass_properties_override_version(self, ref, overrideVersion, linkDocumentId=None, useMassPropertyOverrides=False, inferMetadataOwner=False):
+    def _direct_part_mass_properties_override_version_request(self, ref, overrideVersion, linkDocumentId=None, useMassPropertyOverrides=False, inferMetadataOwner=False):
         query = {
             "configuration": ref.ref.configuration,
             "useMassPropertyOverrides": useMassPropertyOverrides,
@@ -210,7 +383,26 @@ class Client():
             query["linkDocumentId"] = linkDocumentId
 
         url = f'/api/parts/d/{ref.ref.documentId}/v/{overrideVersion}/e/{ref.ref.elementId}/partid/{ref.partId}/massproperties'
-        return self.request_cached("get", url, query=query)["bodies"][ref.partId]
+        return {"method": "get", "url": url, "query": query}
+
+    def get_direct_part_mass_properties_override_version(self, ref, overrideVersion, linkDocumentId=None, useMassPropertyOverrides=False, inferMetadataOwner=False):
+        request = self._direct_part_mass_properties_override_version_request(ref, overrideVersion, linkDocumentId=linkDocumentId, useMassPropertyOverrides=useMassPropertyOverrides, inferMetadataOwner=inferMetadataOwner)
+        return self.request_cached(**request)["bodies"][ref.partId]
+
+    def get_direct_part_mass_properties_override_version_many(self, refs, overrideVersions, linkDocumentId=None, useMassPropertyOverrides=False, inferMetadataOwner=False):
+        '''
+        Like `get_direct_part_mass_properties_override_version`, but for many parts at once.
+
+        Returns:
+            - list: Mass properties, in the same order as `refs`
+        '''
+
+        requests = [
+            self._direct_part_mass_properties_override_version_request(ref, overrideVersion, linkDocumentId=linkDocumentId, useMassPropertyOverrides=useMassPropertyOverrides, inferMetadataOwner=inferMetadataOwner)
+            for ref, overrideVersion in zip(refs, overrideVersions)
+        ]
+        results = self.request_cached_many(requests)
+        return [props["bodies"][ref.partId] for ref, props in zip(refs, results)]
 
     #def get_part_mass_properties(self, ref, linkDocumentId=None, useMassPropertyOverrides=False):
     #    query = {
@@ -235,14 +427,27 @@ class Client():
 
         return self.request_cached("get", url, query=query)
 
-    def get_part_body_details(self, ref):
+    def _part_body_details_request(self, ref):
         query = {
             "configuration": ref.ref.configuration
         }
         url = f'/api/parts/d/{ref.ref.documentId}/m/{ref.ref.microversionId}/e/{ref.ref.elementId}/partid/{ref.partId}/bodydetails'
-        return self.request_cached("get", url, query=query)
+        return {"method": "get", "url": url, "query": query}
 
-    def get_part_stl(self, ref, units="meter", mode="binary"):
+    def get_part_body_details(self, ref):
+        return self.request_cached(**self._part_body_details_request(ref))
+
+    def get_part_body_details_many(self, refs):
+        '''
+        Like `get_part_body_details`, but for many parts at once.
+
+        Returns:
+            - list: Body details, in the same order as `refs`
+        '''
+
+        return self.request_cached_many([self._part_body_details_request(ref) for ref in refs])
+
+    def _part_stl_request(self, ref, units="meter", mode="binary"):
         req_headers = {
             'Accept': '*/*'
         }
@@ -251,7 +456,30 @@ class Client():
             "mode": mode
         }
         url = f'/api/parts/d/{ref.ref.documentId}/m/{ref.ref.microversionId}/e/{ref.ref.elementId}/partid/{ref.partId}/stl'
-        return self.request_cached("get", url, query=query, headers=req_headers)
+        return {"method": "get", "url": url, "query": query, "headers": req_headers}
+
+    def get_part_stl(self, ref, units="meter", mode="binary"):
+        return self.request_cached(**self._part_stl_request(ref, units=units, mode=mode))
+
+    def get_part_stl_many(self, refs, units="meter", mode="binary", max_workers=16):
+        '''
+        Like `get_part_stl`, but downloads all parts concurrently.
+
+        Returns:
+            - list: STL data, in the same order as `refs`
+        '''
+
+        requests = [self._part_stl_request(ref, units=units, mode=mode) for ref in refs]
+        return self.request_cached_many(requests, max_workers=max_workers)
+
+    def iter_part_stl(self, refs, units="meter", mode="binary", max_workers=16):
+        '''
+        Like `get_part_stl_many`, but yields `(index, stl)` pairs as each
+        download completes, so callers can handle one mesh at a time.
+        '''
+
+        requests = [self._part_stl_request(ref, units=units, mode=mode) for ref in refs]
+        return self.request_cached_iter(requests, max_workers=max_workers)
 
     def part_studio_stl(self, did, wid, eid):
         '''
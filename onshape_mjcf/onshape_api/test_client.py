@@ -0,0 +1,124 @@
+import json
+import sqlite3
+import threading
+import pytest
+from onshape_mjcf.onshape_api import client as clientModule
+from onshape_mjcf.onshape_api.client import DT_BIN, DT_JSON, Client, OnshapeCredentials, RequestCache
+
+class StubResponse:
+    def __init__(self, content, contentType, status_code=200):
+        self.status_code = status_code
+        self.headers = {"content-type": contentType}
+        self.content = content
+
+class StubApi:
+    '''
+    Stands in for `Onshape`, answering every request with its url and
+    recording which urls were requested. Urls starting with "/fail" get an
+    error response.
+    '''
+
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def request(self, method, url, query={}, body={}, headers={}):
+        with self._lock:
+            self.calls.append(url)
+        if url.startswith("/fail"):
+            return StubResponse(b"", "application/json;charset=utf-8", status_code=500)
+        if url.endswith("/stl"):
+            return StubResponse(url.encode(), "application/sla;charset=utf-8")
+        return StubResponse(json.dumps({"url": url}).encode(), "application/json;charset=utf-8")
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = RequestCache(tmp_path / "cache.sqlite")
+    monkeypatch.setattr(clientModule, "cache", cache)
+    return cache
+
+@pytest.fixture
+def client(cache):
+    client = Client(OnshapeCredentials(url="", access_key="", secret_key=""))
+    client._api = StubApi()
+    return client
+
+def isCommitted(cache, path, key):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(f"SELECT 1 FROM {cache._table} WHERE key = ?", (key,)).fetchone() is not None
+    finally:
+        conn.close()
+
+def test_request_cached_many_dedups_and_keeps_order(client):
+    requests = [{"method": "get", "url": url} for url in ["/a", "/b", "/a", "/c", "/b"]]
+
+    results = client.request_cached_many(requests, max_workers=4)
+    assert [result["url"] for result in results] == ["/a", "/b", "/a", "/c", "/b"]
+    assert sorted(client._api.calls) == ["/a", "/b", "/c"]
+
+    # Everything is cached now, only the new request goes out
+    results = client.request_cached_many(requests + [{"method": "get", "url": "/d"}])
+    assert [result["url"] for result in results] == ["/a", "/b", "/a", "/c", "/b", "/d"]
+    assert sorted(client._api.calls) == ["/a", "/b", "/c", "/d"]
+
+def test_request_cached_many_blob_round_trip(client, cache):
+    requests = [{"method": "get", "url": "/part/stl"}, {"method": "get", "url": "/part"}]
+
+    assert client.request_cached_many(requests) == [b"/part/stl", {"url": "/part"}]
+    assert client.request_cached_many(requests) == [b"/part/stl", {"url": "/part"}]
+    assert client._api.calls.count("/part/stl") == 1
+
+    # Binary responses are only kept in sqlite
+    key = client._cache_key(**requests[0])
+    assert key not in cache._memory
+    assert cache.get(key) == {"dt": DT_BIN, "d": b"/part/stl"}
+
+def test_request_cache_batch_commits_on_outermost_exit(cache, tmp_path):
+    path = tmp_path / "cache.sqlite"
+
+    with cache.batch():
+        with cache.batch():
+            cache.set("inner", {"dt": DT_JSON, "d": 1})
+        assert not isCommitted(cache, path, "inner")
+    assert isCommitted(cache, path, "inner")
+
+    with pytest.raises(RuntimeError):
+        with cache.batch():
+            cache.set("raised", {"dt": DT_JSON, "d": 2})
+            raise RuntimeError()
+    assert isCommitted(cache, path, "raised")
+
+    cache.set("unbatched", {"dt": DT_JSON, "d": 3})
+    assert isCommitted(cache, path, "unbatched")
+
+def test_request_cached_results_are_not_shared(client):
+    first = client.request_cached("get", "/a")
+    first["url"] = "mutated"
+    assert client.request_cached("get", "/a") == {"url": "/a"}
+
+    requests = [{"method": "get", "url": "/b"}, {"method": "get", "url": "/b"}]
+    results = client.request_cached_many(requests)
+    results[0]["url"] = "mutated"
+    assert results[1] == {"url": "/b"}
+    assert client.request_cached_many(requests) == [{"url": "/b"}, {"url": "/b"}]
+
+def test_request_cached_many_caches_successes_before_raising(client):
+    requests = [{"method": "get", "url": url} for url in ["/a", "/fail", "/b"]]
+
+    with pytest.raises(Exception):
+        client.request_cached_many(requests)
+    assert sorted(client._api.calls) == ["/a", "/b", "/fail"]
+
+    # Only the failed request goes out again
+    with pytest.raises(Exception):
+        client.request_cached_many(requests)
+    assert sorted(client._api.calls) == ["/a", "/b", "/fail", "/fail"]
+
+def test_request_cached_iter_yields_indices(client):
+    client.request_cached("get", "/cached")
+    requests = [{"method": "get", "url": url} for url in ["/a", "/cached", "/a"]]
+
+    results = list(client.request_cached_iter(requests))
+    assert results[0] == (1, {"url": "/cached"})
+    assert sorted(results, key=lambda r: r[0]) == [(0, {"url": "/a"}), (1, {"url": "/cached"}), (2, {"url": "/a"})]
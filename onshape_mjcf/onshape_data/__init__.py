@@ -1,7 +1,9 @@
-from dataclasses import dataclass
+from collections.abc import Mapping
+from dataclasses import dataclass, field
 from functools import cached_property
 import itertools
 import json
+import os
 from typing import Self
 import numpy as np
 import math
@@ -34,7 +36,9 @@ from ..onshape_api.client import Client
 # * QualifeidRef -> Assembly|PartStudio
 # * PartRef -> Part
 
-@dataclass(frozen=True, order=True)
+_instanceIds: dict[str, "InstanceId"] = {}
+
+@dataclass(frozen=True, slots=True, order=True)
 class InstanceId:
     """
     ID of a single instance within an assembly.
@@ -42,12 +46,23 @@ class InstanceId:
 
     id: str
 
+    @classmethod
+    def intern(cls, id: str) -> Self:
+        """
+        Returns the shared `InstanceId` for `id`. The same ids recur in
+        every path through an instance, so only one object is kept per id.
+        """
+        instanceId = _instanceIds.get(id)
+        if instanceId is None:
+            instanceId = cls(id)
+            _instanceIds[id] = instanceId
+        return instanceId
+
     def __str__(self) -> str:
         return "instance;" + self.id
-    def __repr__(self) -> str:
-        return self.__str__()
+    __repr__ = __str__
 
-@dataclass(frozen=True, order=True)
+@dataclass(frozen=True, slots=True, order=True)
 class QualifiedRef:
     """
     The full unique reference to an assembly or part studio.
@@ -57,6 +72,8 @@ class QualifiedRef:
     elementId: str
     microversionId: str
     configuration: str
+    _hash: int | None = field(default=None, init=False, repr=False, compare=False)
+    _str: str | None = field(default=None, init=False, repr=False, compare=False)
 
     @classmethod
     def from_json(cls, data: dict):
@@ -67,18 +84,31 @@ class QualifiedRef:
             configuration=data["configuration"]
         )
 
-    def __str__(self) -> str:
-        return f"qualified;{self.documentId};{self.elementId};{self.microversionId};{self.configuration}"
-    def __repr__(self) -> str:
-        return self.__str__()
+    def __hash__(self) -> int:
+        # Used as a dict key all over, cache the hash.
+        h = getattr(self, "_hash", None)
+        if h is None:
+            h = hash((self.documentId, self.elementId, self.microversionId, self.configuration))
+            object.__setattr__(self, "_hash", h)
+        return h
 
-@dataclass(frozen=True, order=True)
+    def __str__(self) -> str:
+        s = getattr(self, "_str", None)
+        if s is None:
+            s = f"qualified;{self.documentId};{self.elementId};{self.microversionId};{self.configuration}"
+            object.__setattr__(self, "_str", s)
+        return s
+    __repr__ = __str__
+
+@dataclass(frozen=True, slots=True, order=True)
 class PartRef:
     """
     The full unique reference to a part.
     """
     ref: QualifiedRef
     partId: str
+    _hash: int | None = field(default=None, init=False, repr=False, compare=False)
+    _str: str | None = field(default=None, init=False, repr=False, compare=False)
 
     @classmethod
     def from_json(cls, data: dict):
@@ -87,12 +117,23 @@ class PartRef:
             partId=data["partId"]
         )
 
-    def __str__(self) -> str:
-        return f"qualified_part;{self.ref.documentId};{self.ref.elementId};{self.ref.microversionId};{self.ref.configuration};{self.partId}"
-    def __repr__(self) -> str:
-        return self.__str__()
+    def __hash__(self) -> int:
+        # Used as a dict key all over, cache the hash.
+        h = getattr(self, "_hash", None)
+        if h is None:
+            h = hash((self.ref, self.partId))
+            object.__setattr__(self, "_hash", h)
+        return h
 
-@dataclass(frozen=True, order=True)
+    def __str__(self) -> str:
+        s = getattr(self, "_str", None)
+        if s is None:
+            s = f"qualified_part;{self.ref.documentId};{self.ref.elementId};{self.ref.microversionId};{self.ref.configuration};{self.partId}"
+            object.__setattr__(self, "_str", s)
+        return s
+    __repr__ = __str__
+
+@dataclass(frozen=True, slots=True, order=True)
 class InstancePath:
     """
     The full path of a single occurrance of an instance.
@@ -101,19 +142,18 @@ class InstancePath:
 
     root: QualifiedRef
     elements: tuple[InstanceId]
+    _hash: int | None = field(default=None, init=False, repr=False, compare=False)
+    _str: str | None = field(default=None, init=False, repr=False, compare=False)
 
-    def __init__(self, root: QualifiedRef, elements: list[str | InstanceId] | tuple[str | InstanceId]):
-        elementsConv = []
-        for element in elements:
-            if isinstance(element, str):
-                elementsConv.append(InstanceId(element))
-            elif isinstance(element, InstanceId):
-                elementsConv.append(element)
-            else:
-                raise Exception("unknown type")
+    def __init__(self, root: QualifiedRef, elements: list[str] | tuple[InstanceId]):
+        # Elements are either all `str` (from JSON), or all `InstanceId`.
+        if len(elements) > 0 and isinstance(elements[0], InstanceId):
+            elementsConv = tuple(elements)
+        else:
+            elementsConv = tuple([InstanceId.intern(element) for element in elements])
 
         object.__setattr__(self, "root", root)
-        object.__setattr__(self, "elements", tuple(elementsConv))
+        object.__setattr__(self, "elements", elementsConv)
 
     @property
     def instance(self):
@@ -122,17 +162,29 @@ class InstancePath:
     def __len__(self):
         return len(self.elements)
     def __getitem__(self, idx: int) -> Self:
-        return InstancePath(
-            root=self.root,
-            elements=self.elements[:idx + 1]
-        )
+        # The slice is already a tuple of `InstanceId`, no need to go through `__init__`.
+        path = object.__new__(InstancePath)
+        object.__setattr__(path, "root", self.root)
+        object.__setattr__(path, "elements", self.elements[:idx + 1])
+        return path
+
+    def __hash__(self) -> int:
+        # Used as a dict key all over, cache the hash instead of rehashing every element.
+        h = getattr(self, "_hash", None)
+        if h is None:
+            h = hash((self.root, self.elements))
+            object.__setattr__(self, "_hash", h)
+        return h
 
     def __str__(self) -> str:
-        return "occurrence;" + ";".join(map(lambda i: i.id, self.elements))
-    def __repr__(self) -> str:
-        return self.__str__()
-
-@dataclass(frozen=True)
+        s = getattr(self, "_str", None)
+        if s is None:
+            s = "occurrence;" + ";".join([element.id for element in self.elements])
+            object.__setattr__(self, "_str", s)
+        return s
+    __repr__ = __str__
+
+@dataclass(frozen=True, slots=True)
 class FeatureId:
     """
     The ID of a feature.
@@ -143,10 +195,9 @@ class FeatureId:
 
     def __str__(self):
         return f"feature;{self.id}"
-    def __repr__(self) -> str:
-        return self.__str__()
+    __repr__ = __str__
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class MateDefinition:
     """
     The definition of a mate.
@@ -157,28 +208,31 @@ class MateDefinition:
     occurrence: InstancePath
     partToMateT: np.array
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class AssemblyFeature:
     type: str
     id: FeatureId
     suppressed: bool
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class AssemblyMateFeature(AssemblyFeature):
     name: str
     mateType: str
     matedEntities: list[MateDefinition]
 
     @classmethod
-    def from_json(cls, data: dict, ref: QualifiedRef):
+    def from_json(cls, data: dict, ref: QualifiedRef, partToMateTs: np.array=None):
         assert data["featureType"] == "mate"
         sData = data["featureData"]
 
+        if partToMateTs is None:
+            partToMateTs = readCSMatrices([entity["matedCS"] for entity in sData["matedEntities"]])
+
         mated_entities = []
-        for entity in sData["matedEntities"]:
+        for entity, partToMateT in zip(sData["matedEntities"], partToMateTs):
             mated_entities.append(MateDefinition(
                 occurrence=InstancePath(ref, entity["matedOccurrence"]),
-                partToMateT=readCSMatrix(entity["matedCS"])
+                partToMateT=partToMateT
             ))
 
         return cls(
@@ -190,7 +244,7 @@ class AssemblyMateFeature(AssemblyFeature):
             matedEntities=mated_entities
         )
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class AssemblyMateGroupFeature(AssemblyFeature):
     name: str
     occurrences: list[InstancePath]
@@ -212,16 +266,19 @@ class AssemblyMateGroupFeature(AssemblyFeature):
             occurrences=occurrences
         )
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class AssemblyMateConnectorFeature(AssemblyFeature):
     name: str
     definition: MateDefinition
 
     @classmethod
-    def from_json(cls, data: dict, ref: QualifiedRef):
+    def from_json(cls, data: dict, ref: QualifiedRef, partToMateT: np.array=None):
         assert data["featureType"] == "mateConnector"
         sData = data["featureData"]
 
+        if partToMateT is None:
+            partToMateT = readCSMatrix(sData["mateConnectorCS"])
+
         return cls(
             type="mateConnector",
             id=FeatureId(data["id"]),
@@ -229,11 +286,11 @@ class AssemblyMateConnectorFeature(AssemblyFeature):
             name=sData["name"],
             definition=MateDefinition(
                 occurrence=InstancePath(ref, sData["occurrence"]),
-                partToMateT=readCSMatrix(sData["mateConnectorCS"])
+                partToMateT=partToMateT
             )
         )
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Instance:
     type: str
     id: InstanceId
@@ -243,12 +300,12 @@ class Instance:
     @classmethod
     def data_from_json(cls, data: dict):
         return dict(
-            id=InstanceId(data["id"]),
+            id=InstanceId.intern(data["id"]),
             name=data["name"],
             suppressed=data["suppressed"]
         )
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class AssemblyInstance(Instance):
     ref: QualifiedRef
     @classmethod
@@ -259,7 +316,7 @@ class AssemblyInstance(Instance):
             **Instance.data_from_json(data)
         )
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class PartInstance(Instance):
     ref: PartRef
     isStandardContent: bool
@@ -275,7 +332,7 @@ class PartInstance(Instance):
             **Instance.data_from_json(data)
         )
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Assembly:
     type = "assembly"
     ref: QualifiedRef
@@ -288,6 +345,7 @@ class Assembly:
         ref = QualifiedRef.from_json(data)
 
         instances = {}
+        instanceByName = {}
         for instanceData in data["instances"]:
             type = instanceData["type"]
             if type == "Assembly":
@@ -298,24 +356,37 @@ class Assembly:
                 raise Exception("unknown instance type: " + type)
             instances[instance.id] = instance
 
+            assert instance.name not in instanceByName
+            instanceByName[instance.name] = instance.id
+
+        # Read the coordinate systems of all mates and mate connectors
+        # in the assembly in one batch.
+        csData = []
+        for feature in data["features"]:
+            featureType = feature["featureType"]
+            if featureType == "mate":
+                csData.extend(entity["matedCS"] for entity in feature["featureData"]["matedEntities"])
+            elif featureType == "mateConnector":
+                csData.append(feature["featureData"]["mateConnectorCS"])
+        csMatrices = readCSMatrices(csData)
+        csIdx = 0
+
         features = {}
         for feature in data["features"]:
             featureType = feature["featureType"]
             if featureType == "mate":
-                mateFeature = AssemblyMateFeature.from_json(feature, ref)
+                numEntities = len(feature["featureData"]["matedEntities"])
+                mateFeature = AssemblyMateFeature.from_json(feature, ref, partToMateTs=csMatrices[csIdx:csIdx + numEntities])
+                csIdx += numEntities
             elif featureType == "mateGroup":
                 mateFeature = AssemblyMateGroupFeature.from_json(feature, ref)
             elif featureType == "mateConnector":
-                mateFeature = AssemblyMateConnectorFeature.from_json(feature, ref)
+                mateFeature = AssemblyMateConnectorFeature.from_json(feature, ref, partToMateT=csMatrices[csIdx])
+                csIdx += 1
             else:
                 raise Exception("unknown feature type: " + featureType)
             features[mateFeature.id] = mateFeature
 
-        instanceByName = {}
-        for instance in instances.values():
-            assert instance.name not in instanceByName
-            instanceByName[instance.name] = instance.id
-
         return cls(
             ref=ref,
             instances=instances,
@@ -323,7 +394,7 @@ class Assembly:
             features=features
         )
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Part:
     type = "part"
     isStandardContent: bool
@@ -341,18 +412,31 @@ class Part:
         )
     
 def readCSMatrix(data: dict) -> np.array:
-    partMateT = np.eye(4)
-    partMateT[:3, :3] = np.stack(
-        [
-            np.array(data["xAxis"]),
-            np.array(data["yAxis"]),
-            np.array(data["zAxis"])
-        ]
-    ).T
-    partMateT[:3, 3] = data["origin"]
-    return partMateT
-
-@dataclass(frozen=True)
+    # Axes are written straight into their columns, no intermediate arrays.
+    transform = np.empty((4, 4))
+    transform[:3, 0] = data["xAxis"]
+    transform[:3, 1] = data["yAxis"]
+    transform[:3, 2] = data["zAxis"]
+    transform[:3, 3] = data["origin"]
+    transform[3, :3] = 0
+    transform[3, 3] = 1
+    return transform
+
+def readCSMatrices(data: list[dict]) -> np.array:
+    """
+    Reads a list of Onshape coordinate systems into a (N, 4, 4) stack
+    of transforms, with a single array allocation for all of them.
+    """
+    flat = [v for cs in data for v in (*cs["xAxis"], *cs["yAxis"], *cs["zAxis"], *cs["origin"])]
+    axes = np.asarray(flat, dtype=np.float64).reshape((len(data), 4, 3))
+
+    transforms = np.zeros((len(data), 4, 4))
+    transforms[:, :3, :3] = axes[:, :3, :].transpose(0, 2, 1)
+    transforms[:, :3, 3] = axes[:, 3, :]
+    transforms[:, 3, 3] = 1
+    return transforms
+
+@dataclass(frozen=True, slots=True)
 class Occurrence:
     path: InstancePath
     transform: np.array
@@ -360,10 +444,13 @@ class Occurrence:
     hidden: bool
 
     @classmethod
-    def from_json(cls, data: dict, root: QualifiedRef):
+    def from_json(cls, data: dict, root: QualifiedRef, transform: np.array=None):
+        if transform is None:
+            transform = np.array(np.reshape(data["transform"], (4, 4)))
+
         return cls(
             path=InstancePath(root, data["path"]),
-            transform=np.array(np.reshape(data["transform"], (4, 4))),
+            transform=transform,
             fixed=data["fixed"],
             hidden=data["hidden"]
         )
@@ -465,13 +552,42 @@ btm_types = {
     "BTMParameterNullableQuantity": BTMParameterNullableQuantity
 }
 
+class BTMParameters(Mapping):
+    """
+    Parameters of a feature by parameter id.
+    Each parameter is only deserialized when it is first accessed,
+    unknown parameter types read as `None`.
+    """
+
+    def __init__(self, messages: dict[str, tuple[type[BTMParameter] | None, dict]]):
+        self._messages = messages
+        self._decoded = {}
+
+    def __getitem__(self, paramId: str) -> BTMParameter | None:
+        if paramId in self._decoded:
+            return self._decoded[paramId]
+
+        typeClass, paramMessage = self._messages[paramId]
+        value = None
+        if typeClass is not None:
+            value = typeClass(**typeClass.deserialize(paramMessage))
+
+        self._decoded[paramId] = value
+        return value
+
+    def __iter__(self):
+        return iter(self._messages)
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
 @dataclass
 class Mate:
     id: str
     name: str
-    parameters: list[BTMParameter]
+    parameters: "BTMParameters"
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class InstancePathLookup:
     isAbsolute: bool
     occurrence: Occurrence
@@ -485,19 +601,34 @@ class InstancePathLookup:
             elements=self.occurrence.path.elements + path.elements
         )
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class InstanceIdLookup:
     instance: Instance
     archetype: Assembly | Part
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class QualifiedRefLookup:
     archetype: Assembly | Part
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class FeatureIdLookup:
     pass
 
+# Unit conversions for `OnshapeData.readExpression`.
+# Angles are returned as plain radians, lengths as pint quantities.
+_expressionUnits = {
+    "deg": lambda value: value / 360.0 * (2*math.pi),
+    "rad": lambda value: value,
+    "radian": lambda value: value,
+    "mm": lambda value: value * ureg.millimeter,
+    "cm": lambda value: value * ureg.centimeter,
+    "m": lambda value: value * ureg.meter,
+    "in": lambda value: value * ureg.inch,
+}
+
+# Units for which the number may be given as `(PI)`.
+_piUnits = {"rad", "radian"}
+
 @dataclass
 class OnshapeData:
     client: Client
@@ -510,6 +641,12 @@ class OnshapeData:
 
     rootAssemblyId: QualifiedRef
 
+    _prettyNames: dict[InstancePath, str] = field(default_factory=dict, init=False, repr=False)
+    _expressions: dict[str, object] = field(default_factory=dict, init=False, repr=False)
+    _massProperties: dict[PartRef, dict] = field(default_factory=dict, init=False, repr=False)
+    # Filled by `primitive_geom.partToPrimitive`
+    _primitives: dict[PartRef, object] = field(default_factory=dict, init=False, repr=False)
+
     def __getitem__(self, index: InstancePath) -> InstancePathLookup:
         ...
 
@@ -519,51 +656,70 @@ class OnshapeData:
     def __getitem__(self, index: QualifiedRef) -> QualifiedRefLookup:
         ...
 
-    def __getitem__(self, index):
-        def getByQRef(qref):
-            if isinstance(qref, QualifiedRef):
-                return self.assemblies[qref]
-            if isinstance(qref, PartRef):
-                return self.parts[qref]
-            raise Exception("invalid type" + str(qref))
-
-        if isinstance(index, QualifiedRef) or isinstance(index, PartRef):
-            return QualifiedRefLookup(
-                archetype=getByQRef(index)
-            )
+    def _getByRef(self, ref: QualifiedRef | PartRef) -> Assembly | Part:
+        if type(ref) is QualifiedRef:
+            return self.assemblies[ref]
+        if type(ref) is PartRef:
+            return self.parts[ref]
+        raise Exception("invalid type" + str(ref))
 
-        if isinstance(index, InstanceId):
-            inst = self.instances[index]
-            return InstanceIdLookup(
-                instance=inst,
-                archetype=getByQRef(inst.ref)
-            )
+    def _lookupRef(self, index: QualifiedRef | PartRef) -> QualifiedRefLookup:
+        return QualifiedRefLookup(
+            archetype=self._getByRef(index)
+        )
 
-        if isinstance(index, InstancePath):
-            # Occurrence only present if we have an absolute path.
-            isAbsolute = self.rootAssemblyId == index.root
+    def _lookupInstanceId(self, index: InstanceId) -> InstanceIdLookup:
+        inst = self.instances[index]
+        return InstanceIdLookup(
+            instance=inst,
+            archetype=self._getByRef(inst.ref)
+        )
 
-            occ = None
-            if isAbsolute:
-                occ = self.occurrences[index]
+    def _lookupInstancePath(self, index: InstancePath) -> InstancePathLookup:
+        # Occurrence only present if we have an absolute path.
+        isAbsolute = self.rootAssemblyId == index.root
 
-            inst = self.instances[index.instance]
-            return InstancePathLookup(
-                isAbsolute=isAbsolute,
-                occurrence=occ,
-                instance=inst,
-                archetype=getByQRef(inst.ref)
-            )
+        occ = None
+        if isAbsolute:
+            occ = self.occurrences[index]
+
+        inst = self.instances[index.instance]
+        return InstancePathLookup(
+            isAbsolute=isAbsolute,
+            occurrence=occ,
+            instance=inst,
+            archetype=self._getByRef(inst.ref)
+        )
+
+    _lookupByType = {
+        QualifiedRef: _lookupRef,
+        PartRef: _lookupRef,
+        InstanceId: _lookupInstanceId,
+        InstancePath: _lookupInstancePath,
+    }
 
-        raise ValueError("invalid index: " + str(index))
+    def __getitem__(self, index):
+        lookup = self._lookupByType.get(type(index))
+        if lookup is None:
+            raise ValueError("invalid index: " + str(index))
+        return lookup(self, index)
 
     def pathPrettyName(self, path: InstancePath):
-        segments = []
-        for idx in range(len(path)):
-            segments.append(self[path[idx]].instance.name)
-        return " / ".join(segments)
+        name = self._prettyNames.get(path)
+        if name is None:
+            instances = self.instances
+            name = " / ".join([instances[element].name for element in path.elements])
+            self._prettyNames[path] = name
+        return name
 
     def getPartMassProperties(self, ref: PartRef):
+        props = self._massProperties.get(ref)
+        if props is None:
+            props = self._fetchPartMassProperties(ref)
+            self._massProperties[ref] = props
+        return props
+
+    def _fetchPartMassProperties(self, ref: PartRef):
         lookup = self[ref]
 
         if lookup.archetype.isStandardContent:
@@ -588,25 +744,68 @@ class OnshapeData:
                 useMassPropertyOverrides=True
             )
 
+    def getPartMassPropertiesMany(self, refs: list[PartRef]) -> dict[PartRef, dict]:
+        """
+        Like `getPartMassProperties`, but fetches all parts concurrently.
+        Duplicate refs are only requested once.
+        """
+
+        refs = list(dict.fromkeys(refs))
+        parts = [self[ref].archetype for ref in refs if ref not in self._massProperties]
+        standard = [part for part in parts if part.isStandardContent]
+        normal = [part for part in parts if not part.isStandardContent]
+
+        # See `getPartMassProperties` for why standard content is special.
+        assert all(part.documentVersion is not None for part in standard)
+        standardProps = self.client.get_direct_part_mass_properties_override_version_many(
+            [part.ref for part in standard],
+            [part.documentVersion for part in standard],
+            linkDocumentId=self.rootAssemblyId.documentId,
+            useMassPropertyOverrides=True,
+            inferMetadataOwner=True
+        )
+        normalProps = self.client.get_part_mass_properties_many(
+            [part.ref for part in normal],
+            linkDocumentId=self.rootAssemblyId.documentId,
+            useMassPropertyOverrides=True
+        )
+
+        for part, props in zip(itertools.chain(standard, normal), itertools.chain(standardProps, normalProps)):
+            self._massProperties[part.ref] = props
+
+        return {ref: self._massProperties[ref] for ref in refs}
+
     @cached_property
     def occurranceNamePaths(self) -> dict[tuple[str], InstancePath]:
         result = {}
+        assemblies = self.assemblies
+
+        # Depth first traversal with an explicit stack of instance iterators.
+        # `path` and `namePath` are shared and track the current node.
+        path = []
+        namePath = []
+        stack = [iter(assemblies[self.rootAssemblyId].instances.values())]
+        while stack:
+            instance = next(stack[-1], None)
+            if instance is None:
+                stack.pop()
+                if path:
+                    path.pop()
+                    namePath.pop()
+                continue
 
-        def traverse(inst: InstanceId, path: tuple[InstanceId], namePath: tuple[str]):
-            lookup = self[inst]
-
-            subPath = tuple(itertools.chain(path, [inst]))
-            subNamePath = tuple(itertools.chain(namePath, [lookup.instance.name]))
+            path.append(instance.id)
+            namePath.append(instance.name)
 
+            subNamePath = tuple(namePath)
             assert subNamePath not in result
-            result[subNamePath] = InstancePath(self.rootAssemblyId, subPath)
-
-            if lookup.archetype.type == "assembly":
-                for sub in lookup.archetype.instances.values():
-                    traverse(sub.id, subPath, subNamePath)
+            result[subNamePath] = InstancePath(self.rootAssemblyId, tuple(path))
 
-        for instanceId in self[self.rootAssemblyId].archetype.instances.keys():
-            traverse(instanceId, tuple(), tuple())
+            if isinstance(instance, AssemblyInstance):
+                stack.append(iter(assemblies[instance.ref].instances.values()))
+            else:
+                path.pop()
+                namePath.pop()
 
         return result
 
@@ -642,12 +841,21 @@ class OnshapeData:
     @cached_property
     def occurrenceToRef(self) -> dict[InstancePath, QualifiedRef]:
         occurrenceToRef = {}
+        occurrences = self.occurrences
+        assemblies = self.assemblies
 
-        for path in self.occurrences.keys():
-            current = self.assemblies[self.rootAssemblyId]
-            for element in path.elements:
-                current = current.instances[element]
-            occurrenceToRef[path] = current.ref
+        # Walk the assembly tree once, sharing path prefixes between siblings.
+        stack = [(tuple(), assemblies[self.rootAssemblyId])]
+        while stack:
+            path, assembly = stack.pop()
+            for instance in assembly.instances.values():
+                subPath = path + (instance.id,)
+                occurrencePath = InstancePath(self.rootAssemblyId, subPath)
+                if occurrencePath not in occurrences:
+                    continue
+                occurrenceToRef[occurrencePath] = instance.ref
+                if isinstance(instance, AssemblyInstance):
+                    stack.append((subPath, assemblies[instance.ref]))
 
         return occurrenceToRef
 
@@ -655,8 +863,13 @@ class OnshapeData:
     def occurrences(self) -> dict[InstancePath, Occurrence]:
         occurrences = {}
 
-        for occurrenceData in self.assembly["rootAssembly"]["occurrences"]:
-            occurrence = Occurrence.from_json(occurrenceData, self.rootAssemblyId)
+        # Convert all transforms in one go, each occurrence gets a view.
+        occurrencesData = self.assembly["rootAssembly"]["occurrences"]
+        flat = [v for occurrenceData in occurrencesData for v in occurrenceData["transform"]]
+        transforms = np.asarray(flat, dtype=np.float64).reshape((len(occurrencesData), 4, 4))
+
+        for occurrenceData, transform in zip(occurrencesData, transforms):
+            occurrence = Occurrence.from_json(occurrenceData, self.rootAssemblyId, transform=transform)
             occurrences[occurrence.path] = occurrence
 
         return occurrences
@@ -674,27 +887,20 @@ class OnshapeData:
             id = FeatureId(message["featureId"])
             name = message["name"]
 
-            parameters = {}
+            messages = {}
             for param in message["parameters"]:
-                typeName = param["typeName"]
                 paramMessage = param["message"]
                 paramId = paramMessage["parameterId"]
-                typeClass = btm_types.get(typeName)
 
-                value = None
-                if typeClass is not None:
-                    data = typeClass.deserialize(paramMessage)
-                    value = typeClass(**data)
-
-                if paramId in parameters:
+                if paramId in messages:
                     raise Exception("duplicate parameter")
 
-                parameters[paramId] = value
+                messages[paramId] = (btm_types.get(param["typeName"]), paramMessage)
 
             mates[id] = Mate(
                 id=id,
                 name=name,
-                parameters=parameters
+                parameters=BTMParameters(messages)
             )
 
         return mates
@@ -711,30 +917,29 @@ class OnshapeData:
         return config_params
 
     def readExpression(self, expression: str):
+        value = self._expressions.get(expression)
+        if value is None:
+            value = self._readExpression(expression)
+            self._expressions[expression] = value
+        return value
+
+    def _readExpression(self, expression: str):
         # TODO improve
         if expression[0] == "#":
             expression = self.configuration_parameters[expression[1:]]
-        if expression[0:2] == "#":
+        elif expression[0:2] == "-#":
             expression = "-" + self.configuration_parameters[expression[2:]]
 
-        parts = expression.split(' ')
-        if parts[1] == 'deg':
-            return float(parts[0]) / 360.0 * (2*math.pi)
-        if parts[1] in ['radian', 'rad']:
-            if parts[0] == '(PI)':
-                value = math.pi
-            else:
-                value = float(parts[0])
-            return value
-        if parts[1] == 'mm':
-            return float(parts[0]) * ureg.millimeter
-        if parts[1] == 'cm':
-            return float(parts[0]) * ureg.centimeter
-        if parts[1] == 'm':
-            return float(parts[0]) * ureg.meter
-        if parts[1] == 'in':
-            return float(parts[0]) * ureg.inch
-        raise NotImplementedError()
+        number, unit = expression.split()[:2]
+        convert = _expressionUnits.get(unit)
+        if convert is None:
+            raise NotImplementedError()
+
+        if number == '(PI)' and unit in _piUnits:
+            value = math.pi
+        else:
+            value = float(number)
+        return convert(value)
 
     @classmethod
     def from_onshape(_cls, client: Client, documentId: str, assemblyName: str, versionId=None, workspaceId=None, configuration="default"):
@@ -760,8 +965,9 @@ class OnshapeData:
         # Fetch base data for assembly.
         assemblyRef = QualifiedRef(documentId=documentId, elementId=assemblyId, microversionId=microversionId, configuration=configuration)
         assembly = client.get_assembly(assemblyRef)
-        with open("assembly.json", "w") as f:
-            f.write(json.dumps(assembly))
+        if os.environ.get("ONSHAPE_DUMP_JSON"):
+            with open("assembly.json", "w") as f:
+                json.dump(assembly, f)
         joint_features = client.get_features(assemblyRef)
 
         return OnshapeData(
@@ -3,13 +3,22 @@ import numpy as np
 from onshape_mjcf import RobotDescription
 from onshape_mjcf.onshape_data import Assembly, InstancePath, OnshapeData, Part, QualifiedRef
 from onshape_mjcf.util import warn, error
-from onshape_mjcf.util.inertial import InertialData, TransformedInertialData, combineInertials
+from onshape_mjcf.util.inertial import InertialBatch, InertialData, TransformedInertialData, combineInertials
+
+def readMassProps(props: dict) -> tuple[float, np.array, np.array]:
+    """
+    Reads `(mass, centroid, inertia)` from an Onshape mass properties response.
+    """
 
-def onshapeMassPropsToInertial(props: dict, frame: np.array=None) -> InertialData:
     inertia, _inertiaMin, _inertiaMax = np.array(props["inertia"]).reshape((3, 3, 3))
     mass, _massMin, _massMax = props["mass"]
     centroid, _centroidMin, _centroidMax = np.array(props["centroid"]).reshape((3, 3))
 
+    return mass, centroid, inertia
+
+def onshapeMassPropsToInertial(props: dict, frame: np.array=None) -> InertialData:
+    mass, centroid, inertia = readMassProps(props)
+
     kwargs = {
         "inertia": inertia,
         "mass": mass,
@@ -53,47 +62,52 @@ def calculateMassPropertiesByParts(client, data: OnshapeData, description: Robot
     and combine them.
     """
 
-    inertials = []
+    # Collect all leaves first, so part mass properties can be fetched in one batch.
+    # Each leaf is `(instance, lookup, isOverridden)`.
+    leaves = []
 
     def traverseInstance(instance):
         lookup = data[instance]
 
         if lookup.archetype.ref in overrides:
+            leaves.append((instance, lookup, True))
+
+        elif isinstance(lookup.archetype, Assembly):
+            for subInstance in description.instanceTree[instance]:
+                traverseInstance(subInstance)
+
+        elif isinstance(lookup.archetype, Part):
+            leaves.append((instance, lookup, False))
+
+        else:
+            assert(False)
+
+    for instance in rootInstances:
+        traverseInstance(instance)
+
+    partProps = data.getPartMassPropertiesMany([lookup.archetype.ref for _, lookup, isOverridden in leaves if not isOverridden])
+
+    batch = InertialBatch(max(len(leaves), 1))
+    for instance, lookup, isOverridden in leaves:
+        if isOverridden:
             override = overrides[lookup.archetype.ref]
 
             if override == "getFromAssembly":
                 assert isinstance(lookup.archetype, Assembly)
                 props = client.get_assembly_mass_properties(lookup.archetype.ref, linkDocumentId=data.rootAssemblyId.documentId)
-                inertials.append(onshapeMassPropsToInertial(props, frame=lookup.occurrence.transform))
+                batch.append(*readMassProps(props), transform=lookup.occurrence.transform)
 
             elif override is not None:
                 override = override.normalize()
-                inertials.append(TransformedInertialData(
-                    mass=override.mass,
-                    centroid=override.centroid,
-                    inertia=override.inertia,
-                    transform=lookup.occurrence.transform
-                ))
-
-            return
-
-        if isinstance(lookup.archetype, Assembly):
-            for subInstance in description.instanceTree[instance]:
-                traverseInstance(subInstance)
+                batch.append(override.mass, override.centroid, override.inertia, transform=lookup.occurrence.transform)
 
-        elif isinstance(lookup.archetype, Part):
-            props = data.getPartMassProperties(lookup.archetype.ref)
+        else:
+            props = partProps[lookup.archetype.ref]
 
             if not props["hasMass"]:
                 warn(f"instance has no mass: {data.pathPrettyName(instance)}")
-                return
-
-            inertials.append(onshapeMassPropsToInertial(props, frame=lookup.occurrence.transform))
-
-        else:
-            assert(False)
+                continue
 
-    for instance in rootInstances:
-        traverseInstance(instance)
+            batch.append(*readMassProps(props), transform=lookup.occurrence.transform)
 
-    return combineInertials(inertials)
\ No newline at end of file
+    return batch.combine()
@@ -1,19 +1,9 @@
 import numpy as np
 
-from onshape_mjcf.onshape_data import OnshapeData
+from onshape_mjcf.onshape_data import OnshapeData, readCSMatrix
 
 def get_T_part_mate(matedEntity: dict):
-    T_part_mate = np.eye(4)
-    T_part_mate[:3, :3] = np.stack(
-        (
-            np.array(matedEntity["matedCS"]["xAxis"]),
-            np.array(matedEntity["matedCS"]["yAxis"]),
-            np.array(matedEntity["matedCS"]["zAxis"]),
-        )
-    ).T
-    T_part_mate[:3, 3] = matedEntity["matedCS"]["origin"]
-
-    return T_part_mate
+    return readCSMatrix(matedEntity["matedCS"])
 
 def getLimits(data: OnshapeData, jointType, id):
     mateData = data.mateParameters[id]
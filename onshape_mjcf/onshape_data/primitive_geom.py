@@ -29,9 +29,14 @@ def linePlaneIntersection(planePoint, planeNormal, rayPoint, rayDirection, epsil
     return Psi
 
 def partToPrimitive(data: OnshapeData, partRef: PartRef):
-    lookup = data[partRef]
+    # A `PartRef` pins the exact part version and configuration, so the
+    # primitive for it never changes and can be shared by every instance.
+    if partRef not in data._primitives:
+        data._primitives[partRef] = _readPrimitive(data.client, partRef)
+    return data._primitives[partRef]
 
-    details = data.client.get_part_body_details(lookup.archetype.ref)
+def _readPrimitive(client, partRef: PartRef):
+    details = client.get_part_body_details(partRef)
     bodies = details["bodies"]
 
     if len(bodies) == 1:
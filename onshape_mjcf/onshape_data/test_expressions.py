@@ -0,0 +1,39 @@
+import math
+from types import SimpleNamespace
+import pytest
+from onshape_mjcf import ureg
+from onshape_mjcf.onshape_data import OnshapeData
+
+def readExpression(expression, configurationParameters={}):
+    # `_readExpression` only needs the configuration parameters from `self`
+    return OnshapeData._readExpression(SimpleNamespace(configuration_parameters=configurationParameters), expression)
+
+def test_readExpression_units():
+    assert math.isclose(readExpression("90 deg"), math.pi / 2)
+    assert readExpression("1.5 rad") == 1.5
+    assert readExpression("1.5 radian") == 1.5
+    assert readExpression("10 mm") == 10 * ureg.millimeter
+    assert readExpression("2 cm") == 2 * ureg.centimeter
+    assert readExpression("0.5 m") == 0.5 * ureg.meter
+    assert readExpression("3 in") == 3 * ureg.inch
+
+def test_readExpression_whitespace_and_trailing_tokens():
+    assert readExpression("  10   mm ") == 10 * ureg.millimeter
+    assert readExpression("10 mm extra") == 10 * ureg.millimeter
+
+def test_readExpression_pi_only_for_radians():
+    assert readExpression("(PI) rad") == math.pi
+    assert readExpression("(PI) radian") == math.pi
+    with pytest.raises(ValueError):
+        readExpression("(PI) mm")
+    with pytest.raises(ValueError):
+        readExpression("(PI) deg")
+
+def test_readExpression_configuration_parameters():
+    parameters = {"angle": "45 deg"}
+    assert math.isclose(readExpression("#angle", parameters), math.pi / 4)
+    assert math.isclose(readExpression("-#angle", parameters), -math.pi / 4)
+
+def test_readExpression_unknown_unit():
+    with pytest.raises(NotImplementedError):
+        readExpression("1 furlong")
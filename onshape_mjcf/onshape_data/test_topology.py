@@ -0,0 +1,20 @@
+from types import SimpleNamespace
+from onshape_mjcf.onshape_data.topology import findStrictSubtrees, makeOccurranceTree
+
+def makeTree(paths):
+    return makeOccurranceTree([SimpleNamespace(elements=path) for path in paths])
+
+def test_findStrictSubtrees_requires_all_children_common():
+    # "A" and the root have the same direct children in both trees, but "A/B"
+    # holds "y" which is not part of the component. Only the leaf is a strict
+    # subtree, previously the whole root was reported.
+    super = makeTree([("A", "B", "x"), ("A", "B", "y")])
+    sub = makeTree([("A", "B", "x")])
+
+    assert findStrictSubtrees(super, sub) == {("A", "B", "x")}
+
+def test_findStrictSubtrees_stops_at_common_roots():
+    super = makeTree([("A", "x"), ("A", "y"), ("C",)])
+    sub = makeTree([("A", "x"), ("A", "y")])
+
+    assert findStrictSubtrees(super, sub) == {("A",)}
@@ -1,8 +1,8 @@
 from collections import defaultdict
 from copy import copy
 import itertools
-import networkx as nx
 from onshape_mjcf.onshape_data import Assembly, AssemblyMateFeature, AssemblyMateGroupFeature, FeatureId, InstancePath, OnshapeData
+from onshape_mjcf.util.unionfind import UnionFind
 
 def findComponents(data: OnshapeData, excluded: set[FeatureId]) -> list[set[InstancePath]]:
     """
@@ -10,7 +10,7 @@ def findComponents(data: OnshapeData, excluded: set[FeatureId]) -> list[set[Inst
     A component is defined as a set of instances that have connectivity through mates.
     """
 
-    graph = nx.Graph()
+    components = UnionFind()
 
     def addEdges(features, canonicalizePath):
         for feature in features.values():
@@ -18,14 +18,14 @@ def findComponents(data: OnshapeData, excluded: set[FeatureId]) -> list[set[Inst
                 continue
             if isinstance(feature, AssemblyMateFeature):
                 if feature.mateType == "FASTENED":
-                    graph.add_edge(
+                    components.union(
                         canonicalizePath(feature.matedEntities[0].occurrence),
                         canonicalizePath(feature.matedEntities[1].occurrence)
                     )
             if isinstance(feature, AssemblyMateGroupFeature):
                 first = canonicalizePath(feature.occurrences[0])
                 for second in feature.occurrences[1:]:
-                    graph.add_edge(
+                    components.union(
                         first,
                         canonicalizePath(second)
                     )
@@ -42,7 +42,7 @@ def findComponents(data: OnshapeData, excluded: set[FeatureId]) -> list[set[Inst
 
         addEdges(lookup.archetype.features, canonicalizePath=lambda p: lookup.canonicalizePath(p))
 
-    return sorted(nx.connected_components(graph))
+    return list(components.sets())
 
 def findCommonAncestor(occurrences: set[InstancePath]):
     occurrences = list(occurrences)
@@ -51,51 +51,53 @@ def findCommonAncestor(occurrences: set[InstancePath]):
     for occ in occurrences:
         assert first.root == occ.root
 
-    elems = first.elements
-    count = len(elems)
-
-    for occ in occurrences[1:]:
-        for idx, (e1, e2) in enumerate(zip(itertools.islice(elems, count), occ.elements)):
-            if e1 != e2:
-                count = min(idx, count)
-                break
+    # Walk the paths column by column, stopping at the first column where they differ.
+    # `tuple.count` compares by identity first, which is the common case for interned ids.
+    columns = zip(*(occ.elements for occ in occurrences))
+    prefix = [column[0] for column in itertools.takewhile(lambda column: column.count(column[0]) == len(column), columns)]
 
     return InstancePath(
         root=first.root,
-        elements=elems[:count]
+        elements=tuple(prefix)
     )
 
-def makeOccurranceTree(paths: list[InstancePath]):
-    graph = nx.DiGraph()
+def makeOccurranceTree(paths: list[InstancePath]) -> dict[tuple, list[tuple]]:
+    """
+    Builds the tree of all prefixes of the given paths, as a map from each
+    node to its children. The root node is the empty tuple.
+    """
+    tree = {(): []}
     for path in paths:
-        elems = []
-        for n2 in path.elements:
-            before = tuple(elems)
-            elems.append(n2)
-            graph.add_edge(before, tuple(elems))
-    return nx.depth_first_search.dfs_tree(graph, ())
+        elems = path.elements
+        for idx in range(1, len(elems) + 1):
+            node = elems[:idx]
+            if node not in tree:
+                tree[node] = []
+                tree[elems[:idx - 1]].append(node)
+    return tree
 
 def findStrictSubtrees(super, sub, rootNode=()):
-    # find common subtrees
+    # find common subtrees, children are visited before their parent
     common_subtrees = set()
-    t1_succ = super.succ
-    t2_succ = sub.succ
-    for path in nx.dfs_postorder_nodes(sub, source=rootNode):
-        if t1_succ[path] != t2_succ[path]:
-            continue
-        for succ in t1_succ[path]:
-            if succ not in common_subtrees:
-                continue
-        common_subtrees.add(path)
-    
-    # find common subtree roots
+    stack = [(rootNode, False)]
+    while stack:
+        path, childrenDone = stack.pop()
+        children = sub[path]
+        if not childrenDone:
+            stack.append((path, True))
+            stack.extend((child, False) for child in children)
+        # `sub` is a subtree of `super`, so equal child counts means equal children.
+        elif len(super[path]) == len(children) and all(child in common_subtrees for child in children):
+            common_subtrees.add(path)
+
+    # find common subtree roots, not descending into a common subtree once found
     common_roots = set()
-    excluded = set()
-
-    view = nx.subgraph_view(sub, filter_node=lambda n1: n1 not in excluded)
-    for path in nx.dfs_preorder_nodes(view, source=rootNode):
+    stack = [rootNode]
+    while stack:
+        path = stack.pop()
         if path in common_subtrees:
-            excluded.update(sub.succ[path])
             common_roots.add(path)
+        else:
+            stack.extend(sub[path])
 
-    return common_roots
\ No newline at end of file
+    return common_roots
@@ -1,13 +1,13 @@
-from collections import defaultdict
+from collections import defaultdict, deque
 import hashlib
 import numpy as np
-import networkx as nx
 from dataclasses import dataclass
 
-from onshape_mjcf.onshape_data import AssemblyMateConnectorFeature, AssemblyMateFeature, FeatureId, InstancePath, OnshapeData, Part, PartRef
+from onshape_mjcf.onshape_data import AssemblyMateConnectorFeature, AssemblyMateFeature, FeatureId, InstanceId, InstancePath, OnshapeData, Part, PartRef
 from onshape_mjcf.onshape_data.joint import getLimits
 from onshape_mjcf.onshape_data.topology import findCommonAncestor, findComponents, findStrictSubtrees, makeOccurranceTree
 from onshape_mjcf.util import formatName
+from onshape_mjcf.util.unionfind import UnionFind
 
 @dataclass
 class EqualityConstraint:
@@ -26,7 +26,7 @@ class RobotDof:
     limits: tuple[float, float] | None
 
     jointType: str
-    jointTransform: np.matrix
+    jointTransform: np.ndarray
 
     child: InstancePath
     parent: InstancePath
@@ -186,7 +186,7 @@ class RobotComponent:
     on every part independently.
     """
 
-    partTree: dict[InstancePath, list[InstancePath]]
+    partTree: dict[tuple[InstanceId], list[tuple[InstanceId]]]
 
     sites: list[Site]
     """
@@ -226,13 +226,14 @@ class RobotDescription:
         rootInstanceTree = makeOccurranceTree(data.occurrences.keys())
 
         instanceTree = {}
-        for node in rootInstanceTree.nodes:
+        for node, children in rootInstanceTree.items():
             nodeP = InstancePath(data.rootAssemblyId, node)
-            instanceTree[nodeP] = list(map(lambda p: InstancePath(data.rootAssemblyId, p), rootInstanceTree.succ[node].keys()))
+            instanceTree[nodeP] = [InstancePath(data.rootAssemblyId, p) for p in children]
 
         # Find component names
         robotComponents = []
         allPartRefs = {}
+        pathToComponentIdx = {}
         for idx, comp in enumerate(components):
             ancestor = findCommonAncestor(comp)
             ancestorLookup = data[ancestor]
@@ -240,6 +241,8 @@ class RobotDescription:
 
             parts = []
             for instancePath in comp:
+                pathToComponentIdx[instancePath] = idx
+
                 lookup = data[instancePath]
                 if isinstance(lookup.archetype, Part):
                     assert instancePath.root == data.rootAssemblyId
@@ -263,11 +266,6 @@ class RobotDescription:
             ))
 
         # Map DOFs to components
-        pathToComponentIdx = {}
-        for idx, comp in enumerate(components):
-            for item in comp:
-                pathToComponentIdx[item] = idx
-
         for dof in dofs.values():
             dof.childComp = pathToComponentIdx[dof.child]
             dof.parentComp = pathToComponentIdx[dof.parent]
@@ -301,27 +299,45 @@ class RobotDescription:
             raise Exception("No root component found by name!")
 
         # Build kinematic tree
-        graph = nx.Graph()
-        graph.add_nodes_from(pathToComponentIdx.values())
-        graph.add_weighted_edges_from(map(lambda dof: (dof.parentComp, dof.childComp, dof.name), dofs.values()))
-
-        # Can have no cycles
-        assert len(nx.cycle_basis(graph)) == 0
+        # Adjacency of component -> neighbour component -> DOF name. Like an
+        # undirected graph, a later DOF between the same components replaces
+        # the earlier one.
+        adjacency = {idx: {} for idx in range(len(robotComponents))}
+        for dof in dofs.values():
+            adjacency[dof.parentComp][dof.childComp] = dof.name
+            adjacency[dof.childComp][dof.parentComp] = dof.name
+
+        connectivity = UnionFind()
+        for idx in adjacency:
+            connectivity.add(idx)
+        for u, neighbours in adjacency.items():
+            for v in neighbours:
+                if u < v:
+                    # Can have no cycles
+                    assert connectivity.find(u) != connectivity.find(v)
+                    connectivity.union(u, v)
 
         # Can have only 1 component
-        if nx.number_connected_components(graph) != 1:
+        connectedComponents = list(connectivity.sets())
+        if len(connectedComponents) != 1:
             for comp in robotComponents:
                 print(comp.idx, comp.name)
             for dof in dofs.values():
                 print(dof.name, dof.parentComp, dof.childComp)
-            print(list(nx.connected_components(graph)))
+            print(connectedComponents)
             raise Exception("CAD graph can only have 1 connected component")
 
-        # DFS to generate kinematic tree from root
-        tree = nx.bfs_tree(graph, rootComponentIdx)
-        componentEdges = dict(map(lambda a: (a, list()), graph.nodes))
-        for u, v in tree.out_edges():
-            componentEdges[u].append(ComponentEdge(u, v, graph.get_edge_data(u, v)["weight"]))
+        # BFS to generate kinematic tree from root
+        componentEdges = {idx: [] for idx in adjacency}
+        visited = {rootComponentIdx}
+        queue = deque([rootComponentIdx])
+        while queue:
+            u = queue.popleft()
+            for v, dofName in adjacency[u].items():
+                if v not in visited:
+                    visited.add(v)
+                    queue.append(v)
+                    componentEdges[u].append(ComponentEdge(u, v, dofName))
 
         # Calculate mesh naming
         allPartRefs = sorted(allPartRefs.items())
@@ -330,8 +346,8 @@ class RobotDescription:
         for ref, exampleInstance in allPartRefs:
             lookup = data[exampleInstance]
 
-            key = f"{lookup.archetype.ref}"
-            digest = hashlib.sha1(key.encode()).hexdigest()
+            # `str(ref)` is cached on the ref, each ref is only hashed once here.
+            digest = hashlib.sha1(str(ref).encode()).hexdigest()
 
             uniqueName = formatName(lookup.instance.name)
             if uniqueName in partNameCounters:
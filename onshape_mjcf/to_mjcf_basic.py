@@ -8,7 +8,7 @@ from onshape_mjcf.mjcf.builder import BodyBuilder, MJCFBuilder
 from onshape_mjcf.onshape_data import InstancePath, OnshapeData
 from onshape_mjcf.onshape_data.inertial import calculateMassPropertiesByParts
 from onshape_mjcf.onshape_data.primitive_geom import CylinderGeom, SphereGeom, partToPrimitive
-from onshape_mjcf.util import formatName
+from onshape_mjcf.util import formatName, transformPoints
 
 @dataclass(kw_only=True)
 class MJCFBuildOptions:
@@ -20,88 +20,101 @@ class MJCFBuildOptions:
     Example: ("Body <1>", "Some Component <1>")
     """
 
+    frictionloss: float | None = None
+    """
+    Friction loss applied to every joint. Left unset in the MJCF if `None`.
+    """
+
+# Joints rotate about the Z axis of the joint frame.
+_jointAxis = np.array([0.0, 0.0, 1.0])
+
 def transformPos(transform: np.array, pos: np.array):
-    return (transform @ np.pad(pos, (0, 1), constant_values=1))[:3]
+    return transform[:3, :3] @ pos + transform[:3, 3]
 
 @dataclass
 class BuildData:
     data: OnshapeData
     description: RobotDescription
     pathToGeomName: dict[InstancePath, str]
+    options: MJCFBuildOptions
 
 def buildMJCFBody(bd: BuildData, parent: BodyBuilder, compIdx: int, dofName=None, freeJoint=False):
-    comp = bd.description.components[compIdx]
-    name = formatName(comp.name)
-    body = parent.body(name)
-
-    if freeJoint:
-        body.freeJoint()
-
-    if dofName is not None:
-        dof = bd.description.dofs[dofName]
-        joint = body.joint()
-        joint.name = dofName
-        #joint.frictionloss = 0.01
-
-        joint.axis = np.asarray(dof.jointTransform[:3, :3]) @ np.array([0, 0, 1])
-        joint.pos = np.asarray(dof.jointTransform)[:3, 3]
-        match dof.jointType:
-            case "revolute":
-                # default in mjcf is hinge
-                pass
-            case _:
-                raise Exception("unknown joint type: " + dof.jointType)
-
-        if dof.limits is not None:
-            joint.range = dof.limits
-
-    for site in comp.sites:
-        siteE = body.site()
-        siteE.name = site.name
-        siteE.pos = site.transform[:3, 3]
-
-    for path in comp.parts:
-        lookup = bd.data[path]
-        mesh = bd.description.meshes[lookup.archetype.ref]
-
-        geom = body.geom()
-
-        name = bd.pathToGeomName.get(path)
-        if name is not None:
-            geom.name = name
-
-        if mesh.originalName.startswith("Collider "):
-            primitive = partToPrimitive(bd.data, lookup.archetype.ref)
-
-            if isinstance(primitive, SphereGeom):
-                geom.type = "sphere"
-                geom.contype = 2
-                geom.size = primitive.radius
-                geom.pos = (lookup.occurrence.transform @ np.pad(primitive.origin, (0, 1), constant_values=1))[:3]
-            elif isinstance(primitive, CylinderGeom):
-                geom.type = "cylinder"
-                geom.contype = 2
-                geom.size = primitive.radius
-                geom.fromto = np.array([
-                    (lookup.occurrence.transform @ np.pad(primitive.fromto[0], (0, 1), constant_values=1))[:3],
-                    (lookup.occurrence.transform @ np.pad(primitive.fromto[1], (0, 1), constant_values=1))[:3]
-                ])
-
-        else:
-            geom.type = "mesh"
-            geom.contype = 0
-            geom.conaffinity = 0
-            geom.transform = lookup.occurrence.transform
-            geom.mesh = mesh.uniqueName
-
-    inertial = calculateMassPropertiesByParts(bd.data.client, bd.data, bd.description, comp.rootInstances) #, overrides=inertialOverrides)
-
-    body.inertial.pos = inertial.centroid
-    body.inertial.mass = inertial.mass
-    body.inertial.inertia = inertial.inertia
-
-    for edge in bd.description.componentEdges[compIdx]:
-        buildMJCFBody(bd, body, edge.v, dofName=edge.dofName)
+    # Depth first over the component tree, with an explicit stack of
+    # `(parent, compIdx, dofName, freeJoint)`.
+    stack = [(parent, compIdx, dofName, freeJoint)]
+    while stack:
+        parent, compIdx, dofName, freeJoint = stack.pop()
+        comp = bd.description.components[compIdx]
+        name = formatName(comp.name)
+        body = parent.body(name)
+
+        if freeJoint:
+            body.freeJoint()
+
+        if dofName is not None:
+            dof = bd.description.dofs[dofName]
+            joint = body.joint()
+            joint.name = dofName
+            if bd.options.frictionloss is not None:
+                joint.frictionloss = bd.options.frictionloss
+
+            joint.axis = dof.jointTransform[:3, :3] @ _jointAxis
+            joint.pos = dof.jointTransform[:3, 3]
+            match dof.jointType:
+                case "revolute":
+                    # default in mjcf is hinge
+                    pass
+                case _:
+                    raise Exception("unknown joint type: " + dof.jointType)
+
+            if dof.limits is not None:
+                joint.range = dof.limits
+
+        for site in comp.sites:
+            siteE = body.site()
+            siteE.name = site.name
+            siteE.pos = site.transform[:3, 3]
+
+        for path in comp.parts:
+            lookup = bd.data[path]
+            mesh = bd.description.meshes[lookup.archetype.ref]
+
+            geom = body.geom()
+
+            name = bd.pathToGeomName.get(path)
+            if name is not None:
+                geom.name = name
+
+            if mesh.originalName.startswith("Collider "):
+                primitive = partToPrimitive(bd.data, lookup.archetype.ref)
+
+                if isinstance(primitive, SphereGeom):
+                    geom.type = "sphere"
+                    geom.contype = 2
+                    geom.size = primitive.radius
+                    geom.pos = transformPos(lookup.occurrence.transform, primitive.origin)
+                elif isinstance(primitive, CylinderGeom):
+                    geom.type = "cylinder"
+                    geom.contype = 2
+                    geom.size = primitive.radius
+                    geom.fromto = transformPoints(lookup.occurrence.transform, primitive.fromto)
+
+            else:
+                geom.type = "mesh"
+                geom.contype = 0
+                geom.conaffinity = 0
+                geom.transform = lookup.occurrence.transform
+                geom.mesh = mesh.uniqueName
+
+        inertial = calculateMassPropertiesByParts(bd.data.client, bd.data, bd.description, comp.rootInstances) #, overrides=inertialOverrides)
+
+        body.inertial.pos = inertial.centroid
+        body.inertial.mass = inertial.mass
+        body.inertial.inertia = inertial.inertia
+
+        # Children are pushed in reverse so they are built in edge order.
+        for edge in reversed(bd.description.componentEdges[compIdx]):
+            stack.append((body, edge.v, edge.dofName, False))
 
 def toMJCFBasic(data: OnshapeData, description: RobotDescription, options=MJCFBuildOptions(), writeMeshes=True):
     mjcf = MJCFBuilder()
@@ -113,24 +126,37 @@ def toMJCFBasic(data: OnshapeData, description: RobotDescription, options=MJCFBu
     bd = BuildData(
         data=data,
         description=description,
-        pathToGeomName=pathToGeomName
+        pathToGeomName=pathToGeomName,
+        options=options
     )
 
     if writeMeshes:
         os.makedirs("models", exist_ok=True)
 
-    # Export meshes and add mesh assets to XML
-    for mesh in tqdm(description.meshes.values(), "exporting meshes"):
-        stl = data.client.get_part_stl(mesh.ref)
-
-        filePath = f"models/{mesh.uniqueName}.stl"
-        if writeMeshes:
-            with open(filePath, "wb") as f:
-                f.write(stl)
-
+    # Add mesh assets to XML, then write each mesh out as its download completes
+    meshes = list(description.meshes.values())
+    for mesh in meshes:
         meshB = mjcf.asset.mesh()
         meshB.name = mesh.uniqueName
-        meshB.file = filePath
+        meshB.file = f"models/{mesh.uniqueName}.stl"
+
+    stls = data.client.iter_part_stl([mesh.ref for mesh in meshes])
+    for idx, stl in tqdm(stls, "exporting meshes", total=len(meshes)):
+        if writeMeshes:
+            # Raw fd write, skips the buffered file object wrapper
+            fd = os.open(f"models/{meshes[idx].uniqueName}.stl", os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            try:
+                view = memoryview(stl)
+                while view:
+                    view = view[os.write(fd, view):]
+            finally:
+                os.close(fd)
+
+    # Fetch mass properties and collider geometry for every part up front, so
+    # the requests run concurrently. Building the body tree then hits the caches.
+    partRefs = list(dict.fromkeys(data[path].archetype.ref for comp in description.components for path in comp.parts))
+    data.getPartMassPropertiesMany(partRefs)
+    data.client.get_part_body_details_many([ref for ref in partRefs if description.meshes[ref].originalName.startswith("Collider ")])
 
     # Write out inferred equality constraints
     for equality in description.equalities:
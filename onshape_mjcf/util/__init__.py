@@ -1,12 +1,23 @@
+from functools import lru_cache
 import re
+import numpy as np
 from colorama import Fore, Style
 
+_instanceNameRe = re.compile(r"^([\w_\. ]+)<[0-9]+>$")
+
+@lru_cache(maxsize=4096)
 def formatName(name: str) -> str:
-    match = re.fullmatch(r"^([\w_\. ]+)<[0-9]+>$", name)
+    match = _instanceNameRe.fullmatch(name)
     if match is not None:
         name = match.group(1)
     return name.strip().lower().replace(" ", "_")
 
+def transformPoints(transform: np.array, points: np.array) -> np.array:
+    """
+    Applies a (4, 4) homogeneous transform to a (N, 3) array of points.
+    """
+    return points @ transform[:3, :3].T + transform[:3, 3]
+
 def warn(string):
     print(Fore.YELLOW + "Warning: " + string + Style.RESET_ALL)
 
@@ -1,49 +1,106 @@
 from typing import Self
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import numpy as np
 
-@dataclass
+def _transformInertial(transform: np.ndarray, centroid: np.ndarray, inertia: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Applies rigid transforms to centroids and inertia tensors. Works on a
+    single inertial as well as on stacks of them.
+    """
+
+    rotation = transform[..., :3, :3]
+    centroid = (rotation @ centroid[..., None])[..., 0] + transform[..., :3, 3]
+    inertia = rotation @ inertia @ rotation.mT
+    return centroid, inertia
+
+@dataclass(frozen=True)
 class InertialData:
     centroid: np.array
     mass: float
     inertia: np.array
 
+    def __post_init__(self):
+        # Pin dtype up front, so integer inputs don't cause promoted copies
+        # in every later operation
+        object.__setattr__(self, "centroid", np.ascontiguousarray(self.centroid, dtype=np.float64))
+        object.__setattr__(self, "inertia", np.ascontiguousarray(self.inertia, dtype=np.float64))
+
     def normalize(self) -> Self:
         return self
 
-@dataclass
+
+@dataclass(frozen=True, eq=False)
 class TransformedInertialData(InertialData):
     transform: np.array
+    _normalized: InertialData | None = field(default=None, init=False, repr=False, compare=False)
 
-    def normalize(self) -> InertialData:
-        rotation = self.transform[:3, :3]
+    def __post_init__(self):
+        super().__post_init__()
+        object.__setattr__(self, "transform", np.ascontiguousarray(self.transform, dtype=np.float64))
 
-        centroid = (self.transform @ np.pad(self.centroid, (0, 1), constant_values=1))[:3]
-        inertia = rotation @ self.inertia @ rotation.T
+    def normalize(self) -> InertialData:
+        # Frozen, so the result can be cached. The same override inertial
+        # is normalized once per instance using it.
+        if self._normalized is not None:
+            return self._normalized
 
-        return InertialData(
+        centroid, inertia = _transformInertial(self.transform, self.centroid, self.inertia)
+        normalized = InertialData(
             centroid=centroid,
             mass=self.mass,
             inertia=inertia
         )
 
-
-def combineInertials(inertials: list[InertialData]) -> InertialData:
-    inertials = list(map(lambda i: i.normalize(), inertials))
-
-    if len(inertials) == 0:
-        raise Exception("Empty inertials list provided")
-
-    total_mass = sum(inertial.mass for inertial in inertials)
-    combined_centroid = sum(inertial.mass * inertial.centroid for inertial in inertials) / total_mass
-
-    combined_inertia = np.zeros((3, 3))
-    for inertial in inertials:
-        # Use parallel axis theorem to transform inertial tensor into central 
-        d = combined_centroid - inertial.centroid
-        d_matrix = np.outer(d, d)
-        inertia_parallel = inertial.inertia + inertial.mass * (np.dot(d, d) * np.eye(3) - d_matrix)
-        combined_inertia += inertia_parallel
+        object.__setattr__(self, "_normalized", normalized)
+        return normalized
+
+
+def normalizeBatch(inertials: list[InertialData]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Normalizes all inertials at once. Returns stacked `(N,)` masses, `(N,3)`
+    centroids and `(N,3,3)` inertia tensors.
+    """
+
+    # Fill the stacked arrays in a single pass, collecting the transforms
+    # to apply afterwards
+    n = len(inertials)
+    masses = np.empty(n)
+    centroids = np.empty((n, 3))
+    inertias = np.empty((n, 3, 3))
+    transforms = np.empty((n, 4, 4))
+    transformed = []
+    for k, inertial in enumerate(inertials):
+        masses[k] = inertial.mass
+        centroids[k] = inertial.centroid
+        inertias[k] = inertial.inertia
+        if isinstance(inertial, TransformedInertialData):
+            transforms[len(transformed)] = inertial.transform
+            transformed.append(k)
+
+    if transformed:
+        transforms = transforms[:len(transformed)]
+        centroids[transformed], inertias[transformed] = _transformInertial(transforms, centroids[transformed], inertias[transformed])
+
+    return masses, centroids, inertias
+
+def _combineArrays(masses: np.ndarray, centroids: np.ndarray, inertias: np.ndarray) -> InertialData:
+    """
+    Combines inertials given as `(N,)` masses, `(N,3)` centroids and `(N,3,3)`
+    inertia tensors, all in the same frame.
+    """
+
+    total_mass = masses.sum()
+    combined_centroid = masses @ centroids / total_mass
+
+    # Use parallel axis theorem to transform inertial tensors into central.
+    # The sum of m * (|d|^2 * I - d d^T) over all inertials is reduced
+    # straight to 3x3, |d|^2 summed being the trace of the weighted outer
+    # product.
+    d = combined_centroid - centroids
+    weightedOuter = np.einsum('n,ni,nj->ij', masses, d, d)
+    combined_inertia = inertias.sum(0)
+    combined_inertia -= weightedOuter
+    combined_inertia.flat[::4] += np.trace(weightedOuter)
 
     return InertialData(
         centroid=combined_centroid,
@@ -51,25 +108,59 @@ def combineInertials(inertials: list[InertialData]) -> InertialData:
         inertia=combined_inertia
     )
 
+class InertialBatch:
+    """
+    Inertials stored as contiguous arrays, for combining many parts without
+    building an `InertialData` per part.
+    """
+
+    def __init__(self, capacity: int = 16):
+        self.masses = np.empty(capacity)
+        self.centroids = np.empty((capacity, 3))
+        self.inertias = np.empty((capacity, 3, 3))
+        self.n = 0
+
+    def __len__(self) -> int:
+        return self.n
+
+    def _grow(self):
+        capacity = max(2 * len(self.masses), 1)
+        for name in ("masses", "centroids", "inertias"):
+            old = getattr(self, name)
+            new = np.empty((capacity,) + old.shape[1:])
+            new[:self.n] = old[:self.n]
+            setattr(self, name, new)
+
+    def append(self, mass: float, centroid: np.array, inertia: np.array, transform: np.array = None):
+        """
+        Appends an inertial. If `transform` is given, centroid and inertia
+        are transformed by it first.
+        """
+
+        if self.n == len(self.masses):
+            self._grow()
+
+        if transform is not None:
+            centroid, inertia = _transformInertial(transform, centroid, inertia)
+
+        self.masses[self.n] = mass
+        self.centroids[self.n] = centroid
+        self.inertias[self.n] = inertia
+        self.n += 1
+
+    def combine(self) -> InertialData:
+        if self.n == 0:
+            raise ValueError("Empty inertials list provided")
+
+        n = self.n
+        return _combineArrays(self.masses[:n], self.centroids[:n], self.inertias[:n])
 
-    mass = 0.0
-    centroid = np.array([0.0, 0, 0])
-
-    for inertial in inertials:
-        mass += inertial.mass
-        centroid += inertial.centroid * inertial.mass
-    
-    if mass > 0:
-        centroid /= mass
-
-    inertia = np.zeros((3, 3))
+def combineInertials(inertials: list[InertialData]) -> InertialData:
+    if len(inertials) == 1:
+        return inertials[0].normalize()
+    if len(inertials) == 0:
+        raise ValueError("Empty inertials list provided")
 
-    for inertial in inertials:
-        r = inertial.centroid - centroid
-        inertia += inertial.inertia + (np.dot(r, r)*np.eye(3) - r.T*r) * inertial.mass
+    masses, centroids, inertias = normalizeBatch(inertials)
+    return _combineArrays(masses, centroids, inertias)
 
-    return InertialData(
-        centroid=centroid,
-        mass=mass,
-        inertia=inertia
-    )
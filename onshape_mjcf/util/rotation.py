@@ -0,0 +1,67 @@
+import math
+import numpy as np
+
+def matrixToQuat(rotation: np.array) -> tuple[float, float, float, float]:
+    """
+    Rotation matrix -> quaternion (Shoemake), branching on the largest
+    diagonal combination for numerical stability.
+    Returned in MJCF (w, x, y, z) order.
+    """
+    (r00, r01, r02), (r10, r11, r12), (r20, r21, r22) = rotation.tolist()
+    tr = r00 + r11 + r22
+    if tr > 0:
+        s = math.sqrt(tr + 1.0) * 2
+        return (0.25 * s, (r21 - r12) / s, (r02 - r20) / s, (r10 - r01) / s)
+    elif r00 > r11 and r00 > r22:
+        s = math.sqrt(1.0 + r00 - r11 - r22) * 2
+        return ((r21 - r12) / s, 0.25 * s, (r01 + r10) / s, (r02 + r20) / s)
+    elif r11 > r22:
+        s = math.sqrt(1.0 + r11 - r00 - r22) * 2
+        return ((r02 - r20) / s, (r01 + r10) / s, 0.25 * s, (r12 + r21) / s)
+    else:
+        s = math.sqrt(1.0 + r22 - r00 - r11) * 2
+        return ((r10 - r01) / s, (r02 + r20) / s, (r12 + r21) / s, 0.25 * s)
+
+def matricesToQuats(rotations: np.array) -> np.array:
+    """
+    Batched `matrixToQuat` over a (N, 3, 3) stack of rotation matrices.
+    Takes the same branch per matrix, so results match the scalar version.
+    """
+    r = rotations
+    r00, r01, r02 = r[:, 0, 0], r[:, 0, 1], r[:, 0, 2]
+    r10, r11, r12 = r[:, 1, 0], r[:, 1, 1], r[:, 1, 2]
+    r20, r21, r22 = r[:, 2, 0], r[:, 2, 1], r[:, 2, 2]
+    tr = r00 + r11 + r22
+
+    c0 = tr > 0
+    c1 = ~c0 & (r00 > r11) & (r00 > r22)
+    c2 = ~c0 & ~c1 & (r11 > r22)
+    c3 = ~(c0 | c1 | c2)
+
+    quats = np.empty((r.shape[0], 4))
+
+    s = np.sqrt(tr[c0] + 1.0) * 2
+    quats[c0, 0] = 0.25 * s
+    quats[c0, 1] = (r21[c0] - r12[c0]) / s
+    quats[c0, 2] = (r02[c0] - r20[c0]) / s
+    quats[c0, 3] = (r10[c0] - r01[c0]) / s
+
+    s = np.sqrt(1.0 + r00[c1] - r11[c1] - r22[c1]) * 2
+    quats[c1, 0] = (r21[c1] - r12[c1]) / s
+    quats[c1, 1] = 0.25 * s
+    quats[c1, 2] = (r01[c1] + r10[c1]) / s
+    quats[c1, 3] = (r02[c1] + r20[c1]) / s
+
+    s = np.sqrt(1.0 + r11[c2] - r00[c2] - r22[c2]) * 2
+    quats[c2, 0] = (r02[c2] - r20[c2]) / s
+    quats[c2, 1] = (r01[c2] + r10[c2]) / s
+    quats[c2, 2] = 0.25 * s
+    quats[c2, 3] = (r12[c2] + r21[c2]) / s
+
+    s = np.sqrt(1.0 + r22[c3] - r00[c3] - r11[c3]) * 2
+    quats[c3, 0] = (r10[c3] - r01[c3]) / s
+    quats[c3, 1] = (r02[c3] + r20[c3]) / s
+    quats[c3, 2] = (r12[c3] + r21[c3]) / s
+    quats[c3, 3] = 0.25 * s
+
+    return quats
@@ -1,5 +1,7 @@
+import dataclasses
 import numpy as np
-from onshape_mjcf.util.inertial import InertialData, TransformedInertialData, combineInertials
+import pytest
+from onshape_mjcf.util.inertial import InertialBatch, InertialData, TransformedInertialData, combineInertials, normalizeBatch
 
 def test_combineInertials_single_inertial():
     inertial = TransformedInertialData(
@@ -71,4 +73,75 @@ def test_combineInertials_rotation_transform():
     result = combineInertials([inertial])
     assert result.mass == 5.0
     assert np.allclose(result.centroid, np.array([-1, -2, 3]))
-    assert np.allclose(result.inertia, np.array([[1, 0, 0], [0, 2, 0], [0, 0, 3]]))
\ No newline at end of file
+    assert np.allclose(result.inertia, np.array([[1, 0, 0], [0, 2, 0], [0, 0, 3]]))
+
+def test_inertialBatch_matches_combineInertials():
+    translate = np.array([[1, 0, 0, 1], [0, 1, 0, 1], [0, 0, 1, 1], [0, 0, 0, 1]])
+    inertials = [
+        TransformedInertialData(
+            centroid=np.array([i, -i, 2 * i]),
+            mass=1.0 + i,
+            inertia=np.diag([1.0, 2.0, 3.0]),
+            transform=translate
+        )
+        for i in range(5)
+    ]
+
+    batch = InertialBatch(capacity=2)
+    for inertial in inertials:
+        batch.append(inertial.mass, inertial.centroid, inertial.inertia, transform=inertial.transform)
+
+    assert len(batch) == 5
+    assert np.allclose(batch.centroids[1], np.array([2, 0, 3]))
+
+    expected = combineInertials(inertials)
+    result = batch.combine()
+    assert np.isclose(result.mass, expected.mass)
+    assert np.allclose(result.centroid, expected.centroid)
+    assert np.allclose(result.inertia, expected.inertia)
+
+def test_normalizeBatch_matches_normalize():
+    inertials = [
+        InertialData(
+            centroid=np.array([1, 2, 3]),
+            mass=2.0,
+            inertia=np.array([[1, 0, 0], [0, 2, 0], [0, 0, 3]])
+        ),
+        TransformedInertialData(
+            centroid=np.array([1, 2, 3]),
+            mass=5.0,
+            inertia=np.array([[1, 0, 0], [0, 2, 0], [0, 0, 3]]),
+            transform=np.array([[0, -1, 0, 1], [1, 0, 0, 2], [0, 0, 1, 3], [0, 0, 0, 1]])
+        ),
+    ]
+    masses, centroids, inertias = normalizeBatch(inertials)
+    for k, inertial in enumerate(inertials):
+        normalized = inertial.normalize()
+        assert masses[k] == normalized.mass
+        assert np.allclose(centroids[k], normalized.centroid)
+        assert np.allclose(inertias[k], normalized.inertia)
+
+def test_transformedInertialData_normalize_is_cached():
+    inertial = TransformedInertialData(
+        centroid=np.array([1, 2, 3]),
+        mass=5.0,
+        inertia=np.array([[1, 0, 0], [0, 2, 0], [0, 0, 3]]),
+        transform=np.array([[-1, 0, 0, 0], [0, -1, 0, 0], [0, 0, 1, 0], [0, 0, 0, 1]])
+    )
+    assert inertial.normalize() is inertial.normalize()
+
+def test_inertialData_coerces_to_float64():
+    inertial = TransformedInertialData(
+        centroid=[1, 2, 3],
+        mass=5.0,
+        inertia=np.array([[1, 0, 0], [0, 2, 0], [0, 0, 3]]),
+        transform=np.eye(4, dtype=np.int64)
+    )
+    for array in (inertial.centroid, inertial.inertia, inertial.transform):
+        assert array.dtype == np.float64
+        assert array.flags.c_contiguous
+
+def test_inertialData_is_immutable():
+    inertial = InertialData(centroid=np.zeros(3), mass=1.0, inertia=np.eye(3))
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        inertial.mass = 2.0
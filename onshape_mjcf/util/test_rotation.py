@@ -0,0 +1,46 @@
+import math
+import numpy as np
+from onshape_mjcf.util.rotation import matrixToQuat, matricesToQuats
+
+def quatToMatrix(q):
+    w, x, y, z = q
+    return np.array([
+        [1 - 2*(y*y + z*z), 2*(x*y - z*w), 2*(x*z + y*w)],
+        [2*(x*y + z*w), 1 - 2*(x*x + z*z), 2*(y*z - x*w)],
+        [2*(x*z - y*w), 2*(y*z + x*w), 1 - 2*(x*x + y*y)]
+    ])
+
+# Covers every branch of the conversion: positive trace, and a half turn
+# around each axis (largest diagonal element x, y and z respectively).
+rotations = [
+    np.eye(3),
+    np.array([[0, -1, 0], [1, 0, 0], [0, 0, 1]]),
+    np.diag([1, -1, -1]),
+    np.diag([-1, 1, -1]),
+    np.diag([-1, -1, 1]),
+    quatToMatrix(np.array([1, 2, 3, 4]) / math.sqrt(30)),
+    quatToMatrix(np.array([0.1, -0.7, 0.1, 0.7])),
+]
+
+def test_matrixToQuat_identity():
+    assert np.allclose(matrixToQuat(np.eye(3)), [1, 0, 0, 0])
+
+def test_matrixToQuat_z_quarter_turn():
+    assert np.allclose(matrixToQuat(rotations[1]), [math.sqrt(0.5), 0, 0, math.sqrt(0.5)])
+
+def test_matrixToQuat_half_turns():
+    assert np.allclose(np.abs(matrixToQuat(np.diag([1, -1, -1]))), [0, 1, 0, 0])
+    assert np.allclose(np.abs(matrixToQuat(np.diag([-1, 1, -1]))), [0, 0, 1, 0])
+    assert np.allclose(np.abs(matrixToQuat(np.diag([-1, -1, 1]))), [0, 0, 0, 1])
+
+def test_matrixToQuat_roundtrip():
+    for rotation in rotations:
+        q = matrixToQuat(rotation)
+        assert np.isclose(np.linalg.norm(q), 1)
+        assert np.allclose(quatToMatrix(q), rotation)
+
+def test_matricesToQuats_matches_scalar():
+    quats = matricesToQuats(np.stack(rotations).astype(np.float64))
+    assert quats.shape == (len(rotations), 4)
+    for rotation, quat in zip(rotations, quats):
+        assert np.allclose(quat, matrixToQuat(rotation))
@@ -0,0 +1,17 @@
+from onshape_mjcf.util.unionfind import UnionFind
+
+def test_union_find_sets():
+    uf = UnionFind()
+    uf.union(1, 2)
+    uf.union(3, 4)
+    uf.union(2, 5)
+    uf.add(6)
+    assert list(uf.sets()) == [{1, 2, 5}, {3, 4}, {6}]
+
+def test_union_find_merges_sets():
+    uf = UnionFind()
+    uf.union("a", "b")
+    uf.union("c", "d")
+    uf.union("d", "b")
+    assert uf.find("a") == uf.find("c")
+    assert list(uf.sets()) == [{"a", "b", "c", "d"}]
@@ -0,0 +1,49 @@
+from typing import Hashable, Iterator
+
+class UnionFind:
+    """
+    Disjoint set forest with path compression and union by rank.
+    Sets are reported in the order their first element was added.
+    """
+
+    def __init__(self):
+        self.parent = {}
+        self.rank = {}
+
+    def add(self, item: Hashable):
+        if item not in self.parent:
+            self.parent[item] = item
+            self.rank[item] = 0
+
+    def find(self, item: Hashable) -> Hashable:
+        parent = self.parent
+        root = item
+        while parent[root] != root:
+            root = parent[root]
+
+        # Path compression
+        while parent[item] != root:
+            parent[item], item = root, parent[item]
+
+        return root
+
+    def union(self, a: Hashable, b: Hashable):
+        self.add(a)
+        self.add(b)
+
+        rootA = self.find(a)
+        rootB = self.find(b)
+        if rootA == rootB:
+            return
+
+        if self.rank[rootA] < self.rank[rootB]:
+            rootA, rootB = rootB, rootA
+        self.parent[rootB] = rootA
+        if self.rank[rootA] == self.rank[rootB]:
+            self.rank[rootA] += 1
+
+    def sets(self) -> Iterator[set]:
+        sets = {}
+        for item in self.parent:
+            sets.setdefault(self.find(item), set()).add(item)
+        return iter(sets.values())